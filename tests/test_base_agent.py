@@ -0,0 +1,62 @@
+"""Tests for state BaseAgent shares between agents"""
+
+import asyncio
+
+from workflow.agents import base_agent
+from workflow.agents.base_agent import BaseAgent
+
+
+def test_http_client_per_event_loop():
+    async def http_client():
+        client = BaseAgent._http_client()
+        assert BaseAgent._http_client() is client
+        return client
+
+    first = asyncio.run(http_client())
+    second = asyncio.run(http_client())
+
+    assert first is not second
+    # State of loops that ended without aclose() is dropped with the next loop
+    assert len(base_agent._loop_states) == 1
+
+
+def test_aclose_closes_http_client():
+    async def run():
+        client = BaseAgent._http_client()
+        await BaseAgent.aclose()
+        return client
+
+    client = asyncio.run(run())
+
+    assert client.is_closed
+    assert not base_agent._loop_states
+
+
+def test_client_follows_event_loop():
+    agent = BaseAgent("test", "system", api_key="key")
+    fork = agent.fork()
+
+    async def clients():
+        assert fork.client is agent.client
+        client = agent.client
+        await BaseAgent.aclose()
+        return client
+
+    first = asyncio.run(clients())
+    second = asyncio.run(clients())
+
+    assert first is not second
+    assert first.api_key == "key"
+
+
+def test_rate_limits_per_event_loop(monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_RPM", "1")
+    request = {"messages": [{"role": "user", "content": "hi"}]}
+
+    async def acquire():
+        # A shared bucket would be empty here, or its lock bound to a closed loop
+        await asyncio.wait_for(BaseAgent._acquire_rate_limit(request), timeout=1)
+        await BaseAgent.aclose()
+
+    asyncio.run(acquire())
+    asyncio.run(acquire())
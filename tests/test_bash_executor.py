@@ -0,0 +1,52 @@
+"""Tests for BashExecutor"""
+
+import subprocess
+
+import pytest
+
+from workflow.tools.bash_executor import BashExecutor
+
+
+@pytest.mark.asyncio
+async def test_plain_command_runs_without_shell():
+    result = await BashExecutor().execute("dirname 'a  b/c'")
+
+    assert result.success
+    assert result.output == "a  b\n"
+
+
+@pytest.mark.asyncio
+async def test_builtin_runs_in_shell():
+    # /usr/bin/echo and sh's builtin echo disagree on -e
+    expected = subprocess.run(["sh", "-c", "echo -e x"], capture_output=True, text=True)
+
+    result = await BashExecutor().execute("echo -e x")
+
+    assert result.output == expected.stdout
+
+
+@pytest.mark.asyncio
+async def test_script_without_shebang_falls_back_to_shell(tmp_path):
+    script = tmp_path / "noshebang"
+    script.write_text("echo from sh\n")
+    script.chmod(0o755)
+
+    result = await BashExecutor().execute("./noshebang", working_dir=str(tmp_path))
+
+    assert result.success
+    assert result.output == "from sh\n"
+
+
+@pytest.mark.asyncio
+async def test_builtin_falls_back_to_shell():
+    result = await BashExecutor().execute("exit 3")
+
+    assert not result.success
+    assert result.data["exit_code"] == 3
+
+
+def test_denied_pattern_blocked():
+    allowed, message = BashExecutor()._is_command_allowed("echo hi; sudo rm -rf x")
+
+    assert not allowed
+    assert message == "Denied command pattern: sudo rm"
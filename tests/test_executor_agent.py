@@ -0,0 +1,63 @@
+"""Tests for ExecutorAgent conversations"""
+
+from datetime import datetime
+
+import pytest
+
+from workflow.agents.executor_agent import ExecutorAgent
+from workflow.storage.models import ExecutionResult, WorkflowLanguage, WorkflowStatus
+
+RESULT = ExecutionResult(
+    workflow_name="wf",
+    status=WorkflowStatus.FAILED,
+    started_at=datetime(2024, 1, 1),
+    exit_code=1,
+)
+
+
+def _agent(monkeypatch) -> ExecutorAgent:
+    agent = ExecutorAgent(api_key="key")
+    agent.cache = None
+    agent.tool_choices = []
+
+    async def complete(tools, max_tokens, model=None, tool_choice=None):
+        agent.tool_choices.append(tool_choice)
+        agent.messages.append({"role": "assistant", "content": "SAFE"})
+        return {"message": "SAFE", "tool_uses": [], "usage": {}}
+
+    monkeypatch.setattr(agent, "_complete", complete)
+    return agent
+
+
+def _tool_use_turn(agent: ExecutorAgent) -> dict:
+    return next(
+        message for message in agent.messages
+        if message["role"] == "assistant" and isinstance(message["content"], list)
+        and any(block.get("type") == "tool_use" for block in message["content"])
+    )
+
+
+@pytest.mark.asyncio
+async def test_run_continues_after_validation(monkeypatch):
+    agent = _agent(monkeypatch)
+    await agent.validate_workflow("echo hi", WorkflowLanguage.BASH)
+    await agent.analyze_run(RESULT, "echo hi", WorkflowLanguage.BASH)
+
+    # Verdict and tool call share the assistant turn; the code is sent once
+    roles = [message["role"] for message in agent.messages]
+    assert roles == ["user", "assistant", "user", "assistant"]
+    assert _tool_use_turn(agent) is agent.messages[1]
+
+    # Neither call may answer with another execute_workflow call
+    assert agent.tool_choices == [{"type": "none"}, {"type": "none"}]
+
+
+@pytest.mark.asyncio
+async def test_run_after_unrelated_turn_sends_code(monkeypatch):
+    agent = _agent(monkeypatch)
+    await agent.validate_workflow("echo other", WorkflowLanguage.BASH)
+    await agent.analyze_run(RESULT, "echo hi", WorkflowLanguage.BASH)
+
+    request = agent.messages[2]
+    assert request["role"] == "user" and "echo hi" in request["content"]
+    assert _tool_use_turn(agent) is agent.messages[3]
@@ -0,0 +1,105 @@
+"""Tests for HistoryStore schema migration, reads and failure grouping"""
+
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from workflow.storage.history_store import HistoryStore
+from workflow.storage.models import ExecutionResult, WorkflowStatus
+
+# Schema of databases written before the started_at_ms column existed
+OLD_SCHEMA = """
+    CREATE TABLE executions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        workflow_name TEXT NOT NULL,
+        status TEXT NOT NULL,
+        started_at TEXT NOT NULL,
+        finished_at TEXT,
+        duration REAL,
+        exit_code INTEGER,
+        stdout TEXT,
+        stderr TEXT,
+        error_message TEXT
+    )
+"""
+
+OLD_INSERT = """
+    INSERT INTO executions (workflow_name, status, started_at, error_message)
+    VALUES (?, ?, ?, ?)
+"""
+
+
+def test_migration_backfills_existing_rows(tmp_path):
+    db_path = tmp_path / "history.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(OLD_SCHEMA)
+        conn.execute(OLD_INSERT, ("wf", "failed", "2024-01-01T10:00:00", "timeout"))
+        conn.execute(OLD_INSERT, ("wf", "success", "2024-01-02T10:00:00", None))
+    conn.close()
+
+    store = HistoryStore(db_path)
+    rows = store.get_executions("wf")
+    store.close()
+
+    assert [row.started_at for row in rows] == [
+        datetime(2024, 1, 2, 10, 0),
+        datetime(2024, 1, 1, 10, 0),
+    ]
+
+
+def test_rows_from_older_versions_are_readable_and_backfilled(tmp_path):
+    db_path = tmp_path / "history.db"
+    store = HistoryStore(db_path)
+    store.save_execution(ExecutionResult(
+        workflow_name="wf",
+        status=WorkflowStatus.FAILED,
+        started_at=datetime(2024, 1, 1, 10, 0),
+        error_message="connection refused",
+    ))
+
+    # An older version sharing the database leaves started_at_ms NULL
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(OLD_INSERT, ("wf", "failed", "2024-01-02T10:00:00", "connection reset"))
+    conn.close()
+
+    started = {row.started_at for row in store.get_executions("wf")}
+    assert started == {datetime(2024, 1, 1, 10, 0), datetime(2024, 1, 2, 10, 0)}
+
+    [pattern] = store.get_failure_patterns("wf")
+    assert pattern.pattern_type == "network_error"
+    store.close()
+
+    # Reopening fills the column in, so the row sorts by time again
+    store = HistoryStore(db_path)
+    rows = store.get_executions("wf")
+    store.close()
+
+    assert rows[0].started_at == datetime(2024, 1, 2, 10, 0)
+    with sqlite3.connect(db_path) as conn:
+        missing = conn.execute(
+            "SELECT COUNT(*) FROM executions WHERE started_at_ms IS NULL"
+        ).fetchone()[0]
+    conn.close()
+    assert missing == 0
+
+
+@pytest.mark.parametrize("message, key", [
+    ("Connection timeout after 30s", "timeout"),
+    ("Network unreachable: permission denied", "network_error"),
+    ("Permission denied: module cache", "permission_error"),
+    ("404 Not Found", "not_found"),
+    ("HTTP 429: rate limit exceeded", "rate_limit"),
+    ("401 Authentication failed", "auth_error"),
+    ("SyntaxError: invalid syntax in import", "syntax_error"),
+    ("ImportError: No module named 'yaml'", "dependency_error"),
+    ("Segmentation fault\nTIMEOUT on line 2", "timeout"),
+    ("KeyError: 'name'", "keyerror:"),
+    ("", "unknown"),
+])
+def test_pattern_key_priority(tmp_path, message, key):
+    store = HistoryStore(tmp_path / "history.db")
+    try:
+        assert store._extract_pattern_key(message) == key
+    finally:
+        store.close()
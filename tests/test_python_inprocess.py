@@ -0,0 +1,72 @@
+"""Tests for running Python code in the calling process"""
+
+import asyncio
+import os
+import threading
+
+import pytest
+
+from workflow.tools.python_executor import PythonExecutor
+
+
+@pytest.mark.asyncio
+async def test_output_is_captured_and_restored(capsys):
+    result = await PythonExecutor(inprocess=True).execute("print('hello')")
+
+    assert result.success
+    assert result.output == "hello\n"
+    assert capsys.readouterr().out == ""
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("code, exit_code", [
+    ("import sys; sys.exit()", 0),
+    ("import sys; sys.exit(4)", 4),
+    ("import sys; sys.exit('bad input')", 1),
+    ("raise ValueError('boom')", 1),
+])
+async def test_exit_codes(code, exit_code):
+    result = await PythonExecutor(inprocess=True).execute(code)
+
+    assert result.data["exit_code"] == exit_code
+    assert result.success == (exit_code == 0)
+
+
+@pytest.mark.asyncio
+async def test_timeout_interrupts_code():
+    result = await PythonExecutor(inprocess=True).execute("while True:\n    pass", timeout=1)
+
+    assert not result.success
+    assert result.error == "Code execution timed out after 1 seconds"
+
+
+@pytest.mark.asyncio
+async def test_working_dir_runs_out_of_process(tmp_path):
+    # Changing this process's cwd would move other threads' relative paths
+    cwd = os.getcwd()
+    result = await PythonExecutor(inprocess=True).execute(
+        "import os; print(os.getcwd(), os.getpid())", working_dir=str(tmp_path)
+    )
+
+    run_cwd, run_pid = result.output.split()
+    assert run_cwd == str(tmp_path)
+    assert int(run_pid) != os.getpid()
+    assert os.getcwd() == cwd
+
+
+def test_other_threads_fall_back_to_worker():
+    # SIGALRM only reaches the main thread, so other threads use the worker
+    executor = PythonExecutor(persistent=True, inprocess=True)
+    results = []
+
+    async def run():
+        try:
+            results.append(await executor.execute("import os; print(os.getpid())"))
+        finally:
+            await executor.close()
+
+    thread = threading.Thread(target=asyncio.run, args=(run(),))
+    thread.start()
+    thread.join()
+
+    assert int(results[0].output) != os.getpid()
@@ -0,0 +1,136 @@
+"""Tests for the persistent Python worker and its protocol"""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+from workflow.tools import python_executor
+from workflow.tools._worker_runner import _HEADER
+from workflow.tools.python_executor import _WORKER_SCRIPT, PythonExecutor
+
+
+def _frame(payload: dict) -> bytes:
+    data = json.dumps(payload).encode()
+    return _HEADER.pack(len(data)) + data
+
+
+def _unframe(data: bytes) -> list:
+    responses = []
+    while data:
+        (size,) = _HEADER.unpack(data[:_HEADER.size])
+        responses.append(json.loads(data[_HEADER.size:_HEADER.size + size]))
+        data = data[_HEADER.size + size:]
+    return responses
+
+
+def test_frame_round_trip(tmp_path):
+    requests = _frame({"code": "print('one')", "timeout": 5, "cwd": str(tmp_path)})
+    requests += _frame({"code": "import os; print(os.getcwd())", "cwd": str(tmp_path)})
+
+    # The worker answers every frame in order and exits when stdin closes
+    proc = subprocess.run(
+        [sys.executable, "-u", str(_WORKER_SCRIPT)],
+        input=requests,
+        capture_output=True,
+        timeout=30,
+    )
+
+    assert proc.returncode == 0
+    first, second = _unframe(proc.stdout)
+    assert first == {"stdout": "one\n", "stderr": "", "exit_code": 0, "timed_out": False}
+    assert second["stdout"] == f"{tmp_path}\n"
+
+
+def test_subprocess_output_is_captured_in_order():
+    code = "import os\nprint('before')\nos.system('echo from child; echo oops >&2')\nprint('after')"
+    proc = subprocess.run(
+        [sys.executable, "-u", str(_WORKER_SCRIPT)],
+        input=_frame({"code": code}) + _frame({"code": "print('next')"}),
+        capture_output=True,
+        timeout=30,
+    )
+
+    # Child output goes into the response instead of between frames
+    first, second = _unframe(proc.stdout)
+    assert first["stdout"] == "before\nfrom child\nafter\n"
+    assert first["stderr"] == "oops\n"
+    assert second["stdout"] == "next\n"
+
+
+@pytest.mark.asyncio
+async def test_subprocess_output_appears_in_output():
+    executor = PythonExecutor(persistent=True)
+    try:
+        result = await executor.execute("import subprocess; subprocess.run(['echo', 'child'])")
+    finally:
+        await executor.close()
+
+    assert result.output == "child\n"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("code, exit_code, stderr", [
+    ("import sys; sys.exit()", 0, ""),
+    ("import sys; sys.exit(3)", 3, ""),
+    ("import sys; sys.exit('bad input')", 1, "bad input\n"),
+])
+async def test_system_exit_codes(code, exit_code, stderr):
+    executor = PythonExecutor(persistent=True)
+    try:
+        result = await executor.execute(code)
+    finally:
+        await executor.close()
+
+    assert result.data["exit_code"] == exit_code
+    assert result.success == (exit_code == 0)
+    assert (result.error or "") == stderr
+
+
+@pytest.mark.asyncio
+async def test_exception_reports_workflow_traceback():
+    executor = PythonExecutor(persistent=True)
+    try:
+        result = await executor.execute("raise ValueError('boom')")
+    finally:
+        await executor.close()
+
+    assert not result.success
+    assert result.error.startswith("Traceback (most recent call last):\n  File \"<workflow>\"")
+    assert "_worker_runner" not in result.error
+
+
+@pytest.mark.asyncio
+async def test_timeout_interrupts_without_restart():
+    executor = PythonExecutor(persistent=True)
+    try:
+        result = await executor.execute("while True:\n    pass", timeout=1)
+        worker = executor._worker
+        after = await executor.execute("print('still here')")
+    finally:
+        await executor.close()
+
+    assert result.error == "Code execution timed out after 1 seconds"
+    assert after.output == "still here\n"
+    assert executor._worker is None and worker.returncode is not None
+
+
+@pytest.mark.asyncio
+async def test_unresponsive_worker_is_killed_and_respawned(monkeypatch):
+    monkeypatch.setattr(python_executor, "_WORKER_GRACE", 0.5)
+
+    # Ignoring SIGALRM keeps the worker from reporting its own timeout
+    code = "import signal, time\nsignal.signal(signal.SIGALRM, signal.SIG_IGN)\ntime.sleep(30)"
+
+    executor = PythonExecutor(persistent=True)
+    try:
+        result = await executor.execute(code, timeout=1)
+        assert result.error == "Code execution timed out after 1 seconds"
+        assert executor._worker is None
+
+        after = await executor.execute("print('respawned')")
+        assert after.output == "respawned\n"
+        assert executor._worker is not None
+    finally:
+        await executor.close()
@@ -0,0 +1,43 @@
+"""Tests for the semantic (near-duplicate) prompt cache"""
+
+import threading
+
+from workflow.agents.cache import SemanticCache
+
+
+def test_rewording_hits(tmp_path):
+    cache = SemanticCache(path=tmp_path / "semantic.json")
+    cache.insert("Report disk usage above 80 percent", "script", key="bash\ndisk")
+
+    assert cache.lookup("report disk usage above 80 percent!", key="bash\ndisk") == "script"
+
+
+def test_key_must_match(tmp_path):
+    cache = SemanticCache(path=tmp_path / "semantic.json")
+    cache.insert("Report disk usage above 80 percent", "bash script", key="bash\ndisk")
+
+    assert cache.lookup("Report disk usage above 80 percent", key="python\ndisk") is None
+
+
+def test_numbers_must_match(tmp_path):
+    cache = SemanticCache(path=tmp_path / "semantic.json")
+    cache.insert("Report disk usage above 80 percent", "80% script", key="bash\ndisk")
+
+    assert cache.lookup("Report disk usage above 90 percent", key="bash\ndisk") is None
+
+
+def test_concurrent_inserts_persist(tmp_path):
+    path = tmp_path / "semantic.json"
+    cache = SemanticCache(path=path)
+
+    def insert_many(worker: int) -> None:
+        for i in range(20):
+            cache.insert(f"task {worker} {i}", "script", key=str(worker))
+
+    threads = [threading.Thread(target=insert_many, args=(w,)) for w in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(SemanticCache(path=path)._load()) == 160
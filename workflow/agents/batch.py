@@ -0,0 +1,71 @@
+"""Helpers for fanning out many agent calls"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from anthropic import AsyncAnthropic
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def run_batch(
+    items: List[T],
+    task_fn: Callable[[T], Awaitable[R]],
+    max_concurrency: int = 50,
+) -> List[R]:
+    """Run task_fn over items concurrently
+
+    Args:
+        items: Inputs to process
+        task_fn: Async function applied to each item
+        max_concurrency: Maximum number of tasks in flight
+
+    Returns:
+        Results in the same order as items
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_one(item: T) -> R:
+        async with semaphore:
+            return await task_fn(item)
+
+    return await asyncio.gather(*(run_one(item) for item in items))
+
+
+async def run_message_batch(
+    client: AsyncAnthropic,
+    requests: List[Dict[str, Any]],
+    poll_interval: float = 10.0,
+) -> List[Optional[str]]:
+    """Submit Messages API requests through the Message Batches API
+
+    Batches cost half as much as regular calls but complete asynchronously,
+    so this polls until the batch has ended (minutes, up to 24 hours).
+
+    Args:
+        client: Anthropic client
+        requests: Parameters for messages.create, one dict per request
+        poll_interval: Seconds between status checks
+
+    Returns:
+        Response text per request, in order (None for failed requests)
+    """
+    batch = await client.messages.batches.create(requests=[
+        {"custom_id": str(i), "params": params}
+        for i, params in enumerate(requests)
+    ])
+
+    while batch.processing_status != "ended":
+        await asyncio.sleep(poll_interval)
+        batch = await client.messages.batches.retrieve(batch.id)
+
+    texts: List[Optional[str]] = [None] * len(requests)
+    async for entry in await client.messages.batches.results(batch.id):
+        if entry.result.type == "succeeded":
+            texts[int(entry.custom_id)] = "".join(
+                block.text for block in entry.result.message.content if block.type == "text"
+            )
+
+    return texts
@@ -0,0 +1,268 @@
+"""Response cache for deterministic Claude calls"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Protocol
+
+
+class CacheBackend(Protocol):
+    """Storage backend for cached responses"""
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a stored entry, or None on miss"""
+        ...
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        """Store an entry"""
+        ...
+
+
+class MemoryCacheBackend:
+    """In-process cache backend"""
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(key)
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        self._entries[key] = entry
+
+
+class FileCacheBackend:
+    """On-disk cache backend storing one JSON file per key"""
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        """Initialize file cache
+
+        Args:
+            cache_dir: Cache directory (defaults to ~/workflows/.cache/llm)
+        """
+        if cache_dir is None:
+            cache_dir = Path.home() / "workflows" / ".cache" / "llm"
+
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.cache_dir / f"{key}.json", 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        path = self.cache_dir / f"{key}.json"
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+
+def _jsonable(value: Any) -> Any:
+    """Fallback JSON encoder for SDK content blocks"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+
+class LLMCache:
+    """Caches Claude responses keyed by a hash of the full request"""
+
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl: Optional[float] = None):
+        """Initialize cache
+
+        Args:
+            backend: Storage backend (defaults to in-memory)
+            ttl: Entry lifetime in seconds (None keeps entries forever)
+        """
+        self.backend = backend or MemoryCacheBackend()
+        self.ttl = ttl
+
+    @classmethod
+    def from_env(cls) -> Optional["LLMCache"]:
+        """Build a cache from WORKFLOW_LLM_CACHE
+
+        "1" or "file" enables the on-disk cache, "memory" an in-process one.
+        Unset (the default) disables caching so nondeterministic runs opt out.
+        """
+        mode = os.environ.get("WORKFLOW_LLM_CACHE", "").lower()
+        ttl = os.environ.get("WORKFLOW_LLM_CACHE_TTL")
+        ttl_val = float(ttl) if ttl else None
+
+        if mode in ("1", "file"):
+            return cls(FileCacheBackend(), ttl=ttl_val)
+        if mode == "memory":
+            return cls(MemoryCacheBackend(), ttl=ttl_val)
+        return None
+
+    @staticmethod
+    def make_key(**request: Any) -> str:
+        """Hash request parameters into a cache key"""
+        payload = json.dumps(request, sort_keys=True, default=_jsonable)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached value, or None on miss or expiry"""
+        entry = await asyncio.to_thread(self.backend.get, key)
+        if entry is None:
+            return None
+
+        if self.ttl is not None and time.time() - entry["created_at"] > self.ttl:
+            return None
+
+        return entry["value"]
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a value"""
+        entry = {"created_at": time.time(), "value": value}
+        await asyncio.to_thread(self.backend.set, key, entry)
+
+
+_WORD_RE = re.compile(r"\w+")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def _ngram_vector(text: str, n: int = 3) -> Dict[str, int]:
+    """Character n-gram counts of normalized text"""
+    normalized = " ".join(_WORD_RE.findall(text.lower()))
+    vector: Dict[str, int] = {}
+    for i in range(max(len(normalized) - n + 1, 1)):
+        gram = normalized[i:i + n]
+        vector[gram] = vector.get(gram, 0) + 1
+    return vector
+
+
+def _numbers(text: str) -> List[str]:
+    """Sorted numbers in text; they must match exactly for a hit"""
+    return sorted(_NUMBER_RE.findall(text))
+
+
+def _cosine(a: Dict[str, int], b: Dict[str, int]) -> float:
+    """Cosine similarity of two sparse vectors"""
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(count * b.get(gram, 0) for gram, count in a.items())
+    if not dot:
+        return 0.0
+    norm_a = sum(c * c for c in a.values()) ** 0.5
+    norm_b = sum(c * c for c in b.values()) ** 0.5
+    return dot / (norm_a * norm_b)
+
+
+class SemanticCache:
+    """Near-duplicate prompt cache using character n-gram cosine similarity
+
+    Lookups match rewordings that differ in case, whitespace, punctuation or
+    a few characters. They do not understand synonyms.
+
+    Entries are bucketed by an exact key (e.g. language and name), and a hit
+    also needs the same numbers as the query: "above 80 percent" is very
+    similar to "above 90 percent" by n-grams but asks for a different script.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        threshold: float = 0.92,
+        max_entries: int = 500,
+    ):
+        """Initialize semantic cache
+
+        Args:
+            path: Index file (defaults to ~/workflows/.cache/semantic.json)
+            threshold: Minimum cosine similarity for a hit
+            max_entries: Oldest entries are dropped beyond this size
+        """
+        if path is None:
+            path = Path.home() / "workflows" / ".cache" / "semantic.json"
+
+        self.path = Path(path)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: Optional[list] = None
+
+        # Inserts come from worker threads (to_thread), possibly concurrently
+        self._lock = threading.Lock()
+
+    def _load(self) -> list:
+        if self._entries is None:
+            try:
+                with open(self.path, 'r') as f:
+                    self._entries = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._entries = []
+        return self._entries
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, text: str, key: str = "") -> Optional[str]:
+        """Get the response of the most similar cached prompt above threshold
+
+        Only entries with the same key and the same numbers are considered.
+        """
+        query = _ngram_vector(text)
+        numbers = _numbers(text)
+        best_score, best_response = 0.0, None
+
+        with self._lock:
+            for entry in self._load():
+                if entry.get("key") != key or entry.get("numbers") != numbers:
+                    continue
+                score = _cosine(query, entry["vector"])
+                if score > best_score:
+                    best_score, best_response = score, entry["response"]
+
+        return best_response if best_score >= self.threshold else None
+
+    def insert(self, text: str, response: str, key: str = "") -> None:
+        """Add a prompt/response pair and persist the index"""
+        entry = {
+            "key": key,
+            "numbers": _numbers(text),
+            "vector": _ngram_vector(text),
+            "response": response,
+        }
+
+        with self._lock:
+            entries = self._load()
+            entries.append(entry)
+            del entries[:-self.max_entries]
+            self._save()
+
+    async def get(self, text: str, key: str = "") -> Optional[str]:
+        """Async lookup off the event loop"""
+        return await asyncio.to_thread(self.lookup, text, key)
+
+    async def set(self, text: str, response: str, key: str = "") -> None:
+        """Async insert off the event loop"""
+        await asyncio.to_thread(self.insert, text, response, key)
+
+
+_semantic_cache: Optional[SemanticCache] = None
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Get the shared semantic cache, enabled by WORKFLOW_SEMANTIC_CACHE=1"""
+    global _semantic_cache
+
+    if os.environ.get("WORKFLOW_SEMANTIC_CACHE", "") not in ("1", "true"):
+        return None
+
+    if _semantic_cache is None:
+        threshold = float(os.environ.get("WORKFLOW_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+        _semantic_cache = SemanticCache(threshold=threshold)
+
+    return _semantic_cache
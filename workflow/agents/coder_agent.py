@@ -1,7 +1,8 @@
 """Coder agent for generating workflow code"""
 
-from typing import Optional
-from .base_agent import BaseAgent
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from .base_agent import FAST_MODEL, BaseAgent, cached_prompt
+from .cache import get_semantic_cache
 
 
 CODER_SYSTEM_PROMPT = """You are a workflow code generation specialist for technical users.
@@ -78,6 +79,22 @@ When generating code:
 Always prioritize user control and safety."""
 
 
+# Static instructions sent ahead of each request's spec so they form a cacheable prefix
+GENERATE_PREAMBLE = """Generate a workflow script for the spec below.
+
+If the spec's language is "auto", choose the most appropriate (bash or Python).
+Generate the complete, executable code with detailed comments."""
+
+IMPROVE_PREAMBLE = """Improve the workflow code in the spec below.
+
+Address every listed issue, using the recent execution history when it is given.
+Provide the complete improved code with explanation of changes."""
+
+EXPLAIN_PREAMBLE = """Explain what the workflow in the spec below does.
+
+Provide a clear, step-by-step explanation."""
+
+
 class CoderAgent(BaseAgent):
     """Agent specialized in generating workflow code"""
 
@@ -88,6 +105,50 @@ class CoderAgent(BaseAgent):
             api_key=api_key,
         )
 
+    def _build_generate_prompt(
+        self,
+        name: str,
+        description: str,
+        language: str,
+        additional_context: Optional[str],
+    ) -> List[Dict[str, Any]]:
+        """Build the workflow generation prompt"""
+        spec = f"Name: {name}\n"
+        spec += f"Description: {description}\n"
+        spec += f"Language: {language}\n"
+
+        if additional_context:
+            spec += f"\nAdditional context:\n{additional_context}\n"
+
+        return cached_prompt(GENERATE_PREAMBLE, spec)
+
+    def _semantic_spec(
+        self,
+        name: str,
+        description: str,
+        language: str,
+        additional_context: Optional[str],
+    ) -> Tuple[str, str]:
+        """Split a spec into the semantic cache's (text, key): the description is
+        matched by similarity, language and name must be equal"""
+        return f"{description}\n{additional_context or ''}", f"{language}\n{name}"
+
+    async def _semantic_lookup(
+        self,
+        spec: Tuple[str, str],
+        prompt: List[Dict[str, Any]],
+    ) -> Optional[str]:
+        """Get a cached generation for a near-identical spec and record it in history"""
+        semantic_cache = get_semantic_cache()
+        if not semantic_cache:
+            return None
+
+        cached = await semantic_cache.get(*spec)
+        if cached:
+            self.add_message("user", prompt)
+            self.add_message("assistant", cached)
+        return cached
+
     async def generate_workflow(
         self,
         name: str,
@@ -110,29 +171,64 @@ class CoderAgent(BaseAgent):
                 - explanation: Explanation of the code
                 - prerequisites: Required tools/packages
         """
-        # Build prompt
-        prompt = f"Generate a workflow script:\n\n"
-        prompt += f"Name: {name}\n"
-        prompt += f"Description: {description}\n"
+        prompt = self._build_generate_prompt(name, description, language, additional_context)
 
-        if language != "auto":
-            prompt += f"Language: {language}\n"
-        else:
-            prompt += "Language: Choose the most appropriate (bash or Python)\n"
-
-        if additional_context:
-            prompt += f"\nAdditional context:\n{additional_context}\n"
-
-        prompt += "\nGenerate the complete, executable code with detailed comments."
+        # Reuse a prior generation for a near-identical spec
+        spec = self._semantic_spec(name, description, language, additional_context)
+        cached = await self._semantic_lookup(spec, prompt)
+        if cached:
+            return {
+                "message": cached,
+                "usage": {"input_tokens": 0, "output_tokens": 0},
+            }
 
         # Get response from Claude
         response = await self.send_message(prompt)
 
+        semantic_cache = get_semantic_cache()
+        if semantic_cache:
+            await semantic_cache.set(spec[0], response["message"], spec[1])
+
         return {
             "message": response["message"],
             "usage": response["usage"],
         }
 
+    async def stream_workflow(
+        self,
+        name: str,
+        description: str,
+        language: str = "auto",
+        additional_context: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Generate workflow code, yielding the response text as it arrives
+
+        Args:
+            name: Workflow name
+            description: What the workflow should do
+            language: "python", "bash", or "auto" to let agent decide
+            additional_context: Extra context or requirements
+
+        Yields:
+            Chunks of the response text
+        """
+        prompt = self._build_generate_prompt(name, description, language, additional_context)
+
+        spec = self._semantic_spec(name, description, language, additional_context)
+        cached = await self._semantic_lookup(spec, prompt)
+        if cached:
+            yield cached
+            return
+
+        chunks = []
+        async for text in self.stream_message(prompt):
+            chunks.append(text)
+            yield text
+
+        semantic_cache = get_semantic_cache()
+        if semantic_cache:
+            await semantic_cache.set(spec[0], "".join(chunks), spec[1])
+
     async def improve_workflow(
         self,
         code: str,
@@ -151,16 +247,15 @@ class CoderAgent(BaseAgent):
         Returns:
             Dict with improved code and explanation
         """
-        prompt = "Improve this workflow code:\n\n"
-        prompt += f"```{language}\n{code}\n```\n\n"
-        prompt += "Issues to address:\n"
+        spec = f"```{language}\n{code}\n```\n\n"
+        spec += "Issues to address:\n"
         for i, issue in enumerate(issues, 1):
-            prompt += f"{i}. {issue}\n"
+            spec += f"{i}. {issue}\n"
 
         if execution_history:
-            prompt += f"\nRecent execution history:\n{execution_history}\n"
+            spec += f"\nRecent execution history:\n{execution_history}\n"
 
-        prompt += "\nProvide the complete improved code with explanation of changes."
+        prompt = cached_prompt(IMPROVE_PREAMBLE, spec)
 
         response = await self.send_message(prompt)
 
@@ -179,11 +274,9 @@ class CoderAgent(BaseAgent):
         Returns:
             Dict with explanation
         """
-        prompt = f"Explain what this {language} workflow does:\n\n"
-        prompt += f"```{language}\n{code}\n```\n\n"
-        prompt += "Provide a clear, step-by-step explanation."
+        prompt = cached_prompt(EXPLAIN_PREAMBLE, f"```{language}\n{code}\n```")
 
-        response = await self.send_message(prompt)
+        response = await self.send_message(prompt, model=FAST_MODEL)
 
         return {
             "message": response["message"],
@@ -1,8 +1,11 @@
 """Executor agent for running workflows"""
 
+import ast
+import uuid
 from datetime import datetime
-from typing import Optional
-from .base_agent import BaseAgent
+from typing import Any, Dict, Optional, Tuple
+from .base_agent import FAST_MODEL, BaseAgent, cached_prompt
+from .prompts import compact_log
 from ..storage.models import ExecutionResult, WorkflowStatus, WorkflowLanguage
 from ..tools.bash_executor import BashExecutor
 from ..tools.python_executor import PythonExecutor
@@ -40,6 +43,42 @@ Output format:
 - Provide actionable error messages"""
 
 
+# Static validation instructions, sent ahead of the code as a cacheable prefix
+VALIDATE_PREAMBLE = """Validate the workflow code in the spec below for safety and correctness.
+
+Check for:
+1. Dangerous commands (rm -rf, mkfs, etc.)
+2. Syntax errors
+3. Missing error handling
+4. Required dependencies
+5. Potential issues
+
+Respond with: SAFE or UNSAFE, followed by explanation."""
+
+
+# Claude-side view of local execution; runs are recorded as calls to this tool
+EXECUTE_WORKFLOW_TOOL = {
+    "name": "execute_workflow",
+    "description": "Execute the workflow code from this conversation locally and "
+                   "return its status, exit code, stdout and stderr.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "workflow_name": {
+                "type": "string",
+                "description": "Name of the workflow to execute"
+            },
+            "language": {
+                "type": "string",
+                "enum": ["bash", "python"],
+                "description": "Workflow language"
+            }
+        },
+        "required": ["workflow_name", "language"]
+    }
+}
+
+
 class ExecutorAgent(BaseAgent):
     """Agent specialized in executing workflows"""
 
@@ -54,6 +93,9 @@ class ExecutorAgent(BaseAgent):
         self.bash_executor = BashExecutor()
         self.python_executor = PythonExecutor()
 
+        # Verdict turn of the last validate_workflow call and the code it checked
+        self._validation: Optional[Tuple[Dict[str, Any], str]] = None
+
     async def execute_workflow(
         self,
         workflow_name: str,
@@ -123,6 +165,48 @@ class ExecutorAgent(BaseAgent):
                 error_message=f"Execution error: {str(e)}",
             )
 
+    def static_validate(
+        self,
+        code: str,
+        language: WorkflowLanguage,
+    ) -> dict:
+        """Validate workflow code locally, without an LLM call
+
+        Checks the denied command patterns for both languages, Python syntax,
+        and warns when a bash script does not use set -e.
+
+        Args:
+            code: Code to validate
+            language: Code language
+
+        Returns:
+            Dict with validation results
+        """
+        problems = []
+        warnings = []
+
+        is_allowed, error_msg = self.bash_executor._is_command_allowed(code)
+        if not is_allowed:
+            problems.append(error_msg)
+
+        if language == WorkflowLanguage.PYTHON:
+            try:
+                ast.parse(code)
+            except SyntaxError as e:
+                problems.append(f"Syntax error on line {e.lineno}: {e.msg}")
+        elif "set -e" not in code:
+            warnings.append("Script does not use 'set -e'; failing commands will not stop it")
+
+        if problems:
+            message = "UNSAFE\n" + "\n".join(f"- {p}" for p in problems + warnings)
+        else:
+            message = "SAFE (local checks)" + "".join(f"\n- Warning: {w}" for w in warnings)
+
+        return {
+            "is_safe": not problems,
+            "message": message,
+        }
+
     async def validate_workflow(
         self,
         code: str,
@@ -137,19 +221,19 @@ class ExecutorAgent(BaseAgent):
         Returns:
             Dict with validation results
         """
-        prompt = f"Validate this {language.value} workflow code for safety and correctness:\n\n"
-        prompt += f"```{language.value}\n{code}\n```\n\n"
-        prompt += "Check for:\n"
-        prompt += "1. Dangerous commands (rm -rf, mkfs, etc.)\n"
-        prompt += "2. Syntax errors\n"
-        prompt += "3. Missing error handling\n"
-        prompt += "4. Required dependencies\n"
-        prompt += "5. Potential issues\n\n"
-        prompt += "Respond with: SAFE or UNSAFE, followed by explanation."
-
-        response = await self.send_message(prompt)
+        prompt = cached_prompt(VALIDATE_PREAMBLE, f"```{language.value}\n{code}\n```")
+
+        # Same tool list and model as analyze_run so both calls share the cached
+        # prefix, but the model must answer with a verdict instead of running it
+        response = await self.send_message(
+            prompt,
+            tools=[EXECUTE_WORKFLOW_TOOL],
+            model=FAST_MODEL,
+            tool_choice={"type": "none"},
+        )
 
         is_safe = "SAFE" in response["message"] and "UNSAFE" not in response["message"]
+        self._validation = (self.messages[-1], code)
 
         return {
             "is_safe": is_safe,
@@ -174,10 +258,10 @@ class ExecutorAgent(BaseAgent):
         prompt += f"Duration: {result.duration:.2f}s\n" if result.duration else "Duration: N/A\n"
 
         if result.stdout:
-            prompt += f"\nStdout:\n{result.stdout[:1000]}\n"  # Limit to 1000 chars
+            prompt += f"\nStdout:\n{compact_log(result.stdout)}\n"
 
         if result.stderr:
-            prompt += f"\nStderr:\n{result.stderr[:1000]}\n"
+            prompt += f"\nStderr:\n{compact_log(result.stderr)}\n"
 
         if result.error_message:
             prompt += f"\nError: {result.error_message}\n"
@@ -187,7 +271,89 @@ class ExecutorAgent(BaseAgent):
         prompt += "2. Root cause if failed\n"
         prompt += "3. Suggested next steps\n"
 
-        response = await self.send_message(prompt)
+        response = await self.send_message(prompt, model=FAST_MODEL)
+
+        return {
+            "analysis": response["message"],
+            "usage": response["usage"],
+        }
+
+    async def analyze_run(
+        self,
+        result: ExecutionResult,
+        code: str,
+        language: WorkflowLanguage,
+    ) -> dict:
+        """Analyze a local run as a tool result in the executor conversation
+
+        The run is recorded as an execute_workflow tool call and its output is
+        sent back as the tool result, so Claude's next turn is the analysis.
+        Right after validate_workflow for the same code, the code is already
+        in the conversation and is not sent a second time.
+
+        Args:
+            result: Execution result to analyze
+            code: Workflow code that ran
+            language: Code language
+
+        Returns:
+            Dict with analysis
+        """
+        tool_use = {
+            "type": "tool_use",
+            "id": f"toolu_{uuid.uuid4().hex[:24]}",
+            "name": EXECUTE_WORKFLOW_TOOL["name"],
+            "input": {"workflow_name": result.workflow_name, "language": language.value},
+        }
+
+        validation, self._validation = self._validation, None
+        if (
+            validation is not None and self.messages
+            and self.messages[-1] is validation[0] and validation[1] == code
+        ):
+            # Continue after validation: the run follows its verdict
+            content = self.messages[-1]["content"]
+            if isinstance(content, str):
+                content = [{"type": "text", "text": content}]
+            content = [
+                block for block in content
+                if (block["type"] if isinstance(block, dict) else block.type) != "tool_use"
+            ]
+            self.messages[-1] = {"role": "assistant", "content": content + [tool_use]}
+        else:
+            self.add_message(
+                "user",
+                f"Run the {language.value} workflow '{result.workflow_name}':\n\n"
+                f"```{language.value}\n{code}\n```",
+            )
+            self.messages.append({"role": "assistant", "content": [tool_use]})
+
+        report = f"Status: {result.status.value}\n"
+        report += f"Exit code: {result.exit_code}\n" if result.exit_code is not None else ""
+        report += f"Duration: {result.duration:.2f}s\n" if result.duration else ""
+
+        if result.stdout:
+            report += f"\nStdout:\n```\n{compact_log(result.stdout)}\n```\n"
+
+        if result.stderr:
+            report += f"\nStderr:\n```\n{compact_log(result.stderr)}\n```\n"
+
+        if result.error_message:
+            report += f"\nError message: {result.error_message}\n"
+
+        report += "\nDo not run the workflow again. Analyze this run and provide:\n"
+        report += "1. Summary of what happened\n"
+        report += "2. Root cause of the failure\n"
+        report += "3. Specific code changes to fix it\n"
+        report += "4. Confidence level in the fix\n"
+
+        response = await self.send_tool_result(
+            tool_use["id"],
+            report,
+            tools=[EXECUTE_WORKFLOW_TOOL],
+            model=FAST_MODEL,
+            tool_choice={"type": "none"},
+        )
 
         return {
             "analysis": response["message"],
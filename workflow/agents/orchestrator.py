@@ -1,20 +1,30 @@
 """Main orchestrator agent that coordinates subagents"""
 
-from typing import Optional
-from rich.console import Console
+import asyncio
+import os
+import re
+from typing import Dict, List, Optional
+from rich.live import Live
 from rich.panel import Panel
-from rich.syntax import Syntax
 from rich.progress import Progress, SpinnerColumn, TextColumn
+from rich.text import Text
 
+from .base_agent import BaseAgent
+from .batch import run_batch, run_message_batch
 from .coder_agent import CoderAgent
 from .executor_agent import ExecutorAgent
 from .reviewer_agent import ReviewerAgent
 from ..storage.workflow_store import WorkflowStore
 from ..storage.history_store import HistoryStore
-from ..storage.models import WorkflowConfig, WorkflowLanguage, WorkflowStatus
+from ..storage.models import WorkflowConfig, WorkflowLanguage, WorkflowStatus, code_digest
+from ..display import code_syntax, get_console
 
 
-console = Console()
+console = get_console()
+
+# Markdown code blocks in agent responses
+_CODE_BLOCK_RE = re.compile(r"```(?:python|bash|sh)?\n(.*?)```", re.DOTALL)
+_CODE_BLOCK_STRIP_RE = re.compile(r"```(?:python|bash|sh)?.*?```", re.DOTALL)
 
 
 class Orchestrator:
@@ -41,6 +51,10 @@ class Orchestrator:
         self.executor = ExecutorAgent(api_key=api_key)
         self.reviewer = ReviewerAgent(api_key=api_key)
 
+    async def aclose(self) -> None:
+        """Close the API connections opened on the running event loop"""
+        await BaseAgent.aclose()
+
     async def teach_workflow(
         self,
         name: str,
@@ -71,39 +85,42 @@ class Orchestrator:
                     return None
 
         # Generate code using coder agent
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            console=console,
-        ) as progress:
-            task = progress.add_task("Generating workflow code...", total=None)
+        if interactive:
+            message = await self._stream_generation(name, description, language)
+        else:
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                console=console,
+            ) as progress:
+                task = progress.add_task("Generating workflow code...", total=None)
 
-            result = await self.coder.generate_workflow(
-                name=name,
-                description=description,
-                language=language,
-            )
+                result = await self.coder.generate_workflow(
+                    name=name,
+                    description=description,
+                    language=language,
+                )
 
-            progress.remove_task(task)
+                progress.remove_task(task)
+
+            message = result["message"]
 
         # Extract code from response
-        code = self._extract_code_from_response(result["message"])
+        code = self._extract_code_from_response(message)
         detected_language = self._detect_language(code)
 
-        # Show generated code
-        console.print(Panel(
-            Syntax(code, detected_language, theme="monokai", line_numbers=True),
+        # Show generated code (syntax highlighting runs off the event loop)
+        await asyncio.to_thread(console.print, Panel(
+            code_syntax(code, detected_language),
             title=f"Generated {detected_language.upper()} Code",
             border_style="green",
         ))
 
-        console.print(f"\n[dim]Explanation:[/]")
-        # Show explanation (everything except code blocks)
-        explanation = self._extract_explanation(result["message"])
-        console.print(explanation)
-
-        # Ask for confirmation
+        # Ask for confirmation, showing the explanation (everything except code blocks)
         if interactive:
+            console.print(f"\n[dim]Explanation:[/]")
+            console.print(self._extract_explanation(message))
+
             from rich.prompt import Confirm
             if not Confirm.ask("\n[bold]Save this workflow?[/]", default=True):
                 console.print("[yellow]Workflow not saved.[/]")
@@ -115,9 +132,10 @@ class Orchestrator:
             description=description,
             language=WorkflowLanguage(detected_language),
             code=code,
+            trusted_sha256=code_digest(code),
         )
 
-        self.workflow_store.save(workflow)
+        await asyncio.to_thread(self.workflow_store.save, workflow)
         console.print(f"\n[green]✓[/] Workflow '{name}' saved successfully!")
 
         # Offer to test
@@ -128,16 +146,131 @@ class Orchestrator:
 
         return workflow
 
+    async def teach_workflows(
+        self,
+        specs: List[Dict[str, str]],
+        use_batch_api: bool = False,
+        max_concurrency: int = 8,
+    ) -> List[Optional[WorkflowConfig]]:
+        """Teach many workflows non-interactively
+
+        Args:
+            specs: Dicts with name, description and optional language
+            use_batch_api: Generate through the Message Batches API (half the cost,
+                but results can take minutes to arrive)
+            max_concurrency: Concurrent generations when not using the batch API
+
+        Returns:
+            WorkflowConfig per spec, or None where generation failed
+        """
+        if use_batch_api:
+            messages = await run_message_batch(self.coder.client, [
+                {
+                    "model": self.coder.model,
+                    "max_tokens": 4096,
+                    "system": self.coder.system_blocks,
+                    "messages": [{
+                        "role": "user",
+                        "content": self.coder._build_generate_prompt(
+                            spec["name"], spec["description"], spec.get("language", "auto"), None
+                        ),
+                    }],
+                }
+                for spec in specs
+            ])
+        else:
+            async def generate(spec: Dict[str, str]) -> Optional[str]:
+                try:
+                    result = await self.coder.fork().generate_workflow(
+                        name=spec["name"],
+                        description=spec["description"],
+                        language=spec.get("language", "auto"),
+                    )
+                except Exception as e:
+                    console.print(f"[red]Error:[/] {e}")
+                    return None
+                return result["message"]
+
+            messages = await run_batch(specs, generate, max_concurrency)
+
+        workflows: List[Optional[WorkflowConfig]] = []
+        for spec, message in zip(specs, messages):
+            if message is None:
+                console.print(f"[red]✗[/] Failed to generate workflow '{spec['name']}'")
+                workflows.append(None)
+                continue
+
+            code = self._extract_code_from_response(message)
+            workflows.append(WorkflowConfig(
+                name=spec["name"],
+                description=spec["description"],
+                language=WorkflowLanguage(self._detect_language(code)),
+                code=code,
+                trusted_sha256=code_digest(code),
+            ))
+
+        # Write all workflow files concurrently in worker threads
+        saved = [workflow for workflow in workflows if workflow]
+        await asyncio.gather(*(
+            asyncio.to_thread(self.workflow_store.save, workflow) for workflow in saved
+        ))
+        for workflow in saved:
+            console.print(f"[green]✓[/] Workflow '{workflow.name}' saved")
+
+        return workflows
+
+    async def run_workflows(
+        self,
+        names: List[str],
+        max_concurrency: int = 4,
+    ) -> Dict[str, Optional[bool]]:
+        """Run many workflows non-interactively
+
+        Args:
+            names: Workflow names
+            max_concurrency: Maximum workflows running at once
+
+        Returns:
+            Mapping of workflow name to run_workflow's result
+        """
+        results = await run_batch(
+            names,
+            lambda name: self.run_workflow(name, interactive=False, flush_history=False),
+            max_concurrency,
+        )
+
+        # Executions are saved in batches; wait for the last one
+        await self.history_store.flush()
+
+        return dict(zip(names, results))
+
+    async def _stream_generation(self, name: str, description: str, language: str) -> str:
+        """Render generated code live as it streams in and return the full response"""
+        text = Text()
+
+        with Live(text, console=console, refresh_per_second=10, transient=True):
+            async for chunk in self.coder.stream_workflow(
+                name=name,
+                description=description,
+                language=language,
+            ):
+                text.append(chunk)
+
+        return text.plain
+
     async def run_workflow(
         self,
         name: str,
         interactive: bool = True,
+        flush_history: bool = True,
     ) -> Optional[bool]:
         """Run a workflow
 
         Args:
             name: Workflow name
             interactive: Whether to show progress and ask for confirmation
+            flush_history: Wait for the execution to be saved before returning
+                (callers passing False must call history_store.flush())
 
         Returns:
             True if successful, False if failed, None if cancelled
@@ -151,21 +284,28 @@ class Orchestrator:
         console.print(f"\n[bold blue]Running workflow:[/] {name}")
         console.print(f"[dim]{workflow.description}[/]\n")
 
-        # Validate workflow if interactive
+        # Validate workflow if interactive. Workflows generated by the coder
+        # agent are checked locally; user-provided code gets the LLM review.
         if interactive:
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                console=console,
-            ) as progress:
-                task = progress.add_task("Validating workflow...", total=None)
-
-                validation = await self.executor.validate_workflow(
+            if workflow.trusted and os.environ.get("WORKFLOW_STRICT") != "1":
+                validation = self.executor.static_validate(
                     code=workflow.code,
                     language=workflow.language,
                 )
+            else:
+                with Progress(
+                    SpinnerColumn(),
+                    TextColumn("[progress.description]{task.description}"),
+                    console=console,
+                ) as progress:
+                    task = progress.add_task("Validating workflow...", total=None)
 
-                progress.remove_task(task)
+                    validation = await self.executor.validate_workflow(
+                        code=workflow.code,
+                        language=workflow.language,
+                    )
+
+                    progress.remove_task(task)
 
             if not validation["is_safe"]:
                 console.print(f"[red]✗ Validation failed:[/]")
@@ -176,26 +316,44 @@ class Orchestrator:
                     return None
 
         # Execute workflow
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            console=console,
-        ) as progress:
-            task = progress.add_task("Executing workflow...", total=None)
+        execution = self.executor.execute_workflow(
+            workflow_name=name,
+            code=workflow.code,
+            language=workflow.language,
+            timeout=workflow.timeout,
+        )
 
-            result = await self.executor.execute_workflow(
-                workflow_name=name,
-                code=workflow.code,
-                language=workflow.language,
-                timeout=workflow.timeout,
-            )
+        # The spinner is a live display and a console allows only one at a
+        # time, so non-interactive runs (possibly concurrent) go without it
+        if interactive:
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                console=console,
+            ) as progress:
+                task = progress.add_task("Executing workflow...", total=None)
+                result = await execution
+                progress.remove_task(task)
+        else:
+            result = await execution
 
-            progress.remove_task(task)
+        # Save execution to history in the background while results are shown
+        await self.history_store.enqueue(result)
 
-        # Save execution to history
-        self.history_store.save_execution(result)
+        try:
+            return await self._report_result(name, result, workflow, interactive)
+        finally:
+            if flush_history:
+                await self.history_store.flush()
 
-        # Show results
+    async def _report_result(
+        self,
+        workflow_name: str,
+        result,
+        workflow: WorkflowConfig,
+        interactive: bool,
+    ) -> bool:
+        """Show execution results and offer failure analysis"""
         if result.status == WorkflowStatus.SUCCESS:
             console.print(f"[green]✓ Workflow completed successfully![/]")
             if result.duration:
@@ -203,7 +361,7 @@ class Orchestrator:
 
             if result.stdout:
                 console.print(f"\n[bold]Output:[/]")
-                console.print(result.stdout)
+                await asyncio.to_thread(console.print, result.stdout)
 
             return True
 
@@ -214,7 +372,7 @@ class Orchestrator:
 
             if result.stderr:
                 console.print(f"\n[bold red]Error output:[/]")
-                console.print(result.stderr)
+                await asyncio.to_thread(console.print, result.stderr)
 
             if result.error_message:
                 console.print(f"\n[bold red]Error:[/] {result.error_message}")
@@ -223,7 +381,7 @@ class Orchestrator:
             if interactive:
                 from rich.prompt import Confirm
                 if Confirm.ask("\n[bold]Analyze failure and suggest fixes?[/]", default=True):
-                    await self._analyze_and_fix(name, result, workflow)
+                    await self._analyze_and_fix(workflow_name, result, workflow)
 
             return False
 
@@ -242,10 +400,11 @@ class Orchestrator:
         ) as progress:
             task = progress.add_task("Analyzing failure...", total=None)
 
-            analysis = await self.reviewer.analyze_failure(
+            # Continues the executor conversation (validation, if any) as a tool result
+            analysis = await self.executor.analyze_run(
                 result=result,
                 code=workflow.code,
-                language=workflow.language.value,
+                language=workflow.language,
             )
 
             progress.remove_task(task)
@@ -262,35 +421,29 @@ class Orchestrator:
 
     def _extract_code_from_response(self, response: str) -> str:
         """Extract code from markdown code blocks"""
-        import re
-
-        # Find code blocks
-        pattern = r"```(?:python|bash|sh)?\n(.*?)```"
-        matches = re.findall(pattern, response, re.DOTALL)
+        match = _CODE_BLOCK_RE.search(response)
 
-        if matches:
-            return matches[0].strip()
+        if match:
+            return match.group(1).strip()
 
         # If no code blocks, return the whole response
         return response.strip()
 
     def _extract_explanation(self, response: str) -> str:
         """Extract explanation (non-code) parts"""
-        import re
-
         # Remove code blocks
-        pattern = r"```(?:python|bash|sh)?.*?```"
-        explanation = re.sub(pattern, "[code block shown above]", response, flags=re.DOTALL)
+        explanation = _CODE_BLOCK_STRIP_RE.sub("[code block shown above]", response)
 
         return explanation.strip()
 
     def _detect_language(self, code: str) -> str:
-        """Detect code language"""
-        if code.startswith("#!/bin/bash") or code.startswith("#!/bin/sh"):
+        """Detect code language from the start of the code"""
+        head = code[:256]
+
+        if head.startswith(("#!/bin/bash", "#!/bin/sh")):
             return "bash"
-        elif code.startswith("#!/usr/bin/env python") or "import " in code[:100]:
+        if head.startswith("#!/usr/bin/env python") or "import " in head:
             return "python"
-        elif "echo " in code or "set -e" in code:
+        if "echo " in head or "set -e" in head:
             return "bash"
-        else:
-            return "python"  # Default
+        return "python"  # Default
@@ -0,0 +1,22 @@
+"""Helpers for building prompts shared by the agents"""
+
+import itertools
+
+
+def compact_log(text: str, head: int = 400, tail: int = 1200) -> str:
+    """Shrink command output for a prompt
+
+    Collapses runs of identical lines, then keeps the first head and last tail
+    characters; the tail is kept longer because errors usually appear last.
+    """
+    lines = []
+    for line, group in itertools.groupby(text.splitlines()):
+        count = sum(1 for _ in group)
+        lines.append(line if count == 1 else f"{line}  [repeated {count} times]")
+    text = "\n".join(lines)
+
+    if len(text) <= head + tail:
+        return text
+
+    omitted = text[head:len(text) - tail].count("\n")
+    return f"{text[:head]}\n...[{omitted} lines truncated]...\n{text[-tail:]}"
@@ -0,0 +1,46 @@
+"""Client-side rate limiting for Claude API calls"""
+
+import asyncio
+import time
+
+
+class AsyncTokenBucket:
+    """Token bucket that refills continuously up to its capacity every period"""
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        """Initialize bucket
+
+        Args:
+            capacity: Maximum tokens available per period
+            period: Refill period in seconds
+        """
+        self.capacity = capacity
+        self.rate = capacity / period
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait until amount tokens are available and take them"""
+        amount = min(amount, self.capacity)
+
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= amount
+
+    def adjust(self, amount: float) -> None:
+        """Take (or refund, if negative) tokens without waiting
+
+        Used to settle an estimate once the real cost is known; the balance may
+        go negative, which delays later acquires.
+        """
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - amount)
@@ -1,7 +1,12 @@
 """Reviewer agent for analyzing failures and suggesting improvements"""
 
-from typing import List, Optional
+import json
+import re
+from string import Template
+from typing import AsyncIterator, Dict, List, Optional
 from .base_agent import BaseAgent
+from .batch import run_batch
+from .prompts import compact_log
 from ..storage.models import ExecutionResult, FailurePattern
 
 
@@ -46,6 +51,75 @@ Always provide:
 4. Confidence level (high/medium/low)"""
 
 
+# Prompt scaffolds; optional sections are substituted as complete lines or ""
+ANALYZE_FAILURE_TEMPLATE = Template("""Analyze this workflow failure:
+
+Workflow: $workflow
+$details
+Workflow code:
+```$language
+$code
+```
+
+Provide:
+1. Root cause of the failure
+2. Specific code changes to fix it
+3. Additional improvements to prevent similar issues
+4. Confidence level in the fix
+""")
+
+SUGGEST_IMPROVEMENTS_TEMPLATE = Template("""Review this $language workflow and suggest improvements:
+
+```$language
+$code
+```
+$history
+Suggest improvements for:
+1. Error handling and resilience
+2. Code clarity and maintainability
+3. Performance optimizations
+4. Security considerations
+5. Logging and observability
+
+For each suggestion, provide:
+- What to change and why
+- Code example
+- Expected impact
+""")
+
+
+ANALYZE_FAILURES_BATCH_TEMPLATE = Template("""Analyze the following $count failures of one workflow.
+
+$failures
+Workflow code:
+```$language
+$code
+```
+
+Return only a JSON array with one object per failure:
+[{"index": <failure number>, "root_cause": "...", "fix": "...", "confidence": "high|medium|low"}]
+""")
+
+# JSON array in a response, with or without a surrounding code fence
+_JSON_ARRAY_RE = re.compile(r"\[.*\]", re.DOTALL)
+
+
+def _failure_details(result: ExecutionResult) -> str:
+    """Duration, exit code and output lines of a failure for a prompt"""
+    details = ""
+    if result.duration:
+        details += f"Duration: {result.duration:.2f}s\n"
+    if result.exit_code:
+        details += f"Exit code: {result.exit_code}\n"
+    if result.stdout:
+        details += f"\nStdout:\n```\n{compact_log(result.stdout)}\n```\n"
+    if result.stderr:
+        details += f"\nStderr:\n```\n{compact_log(result.stderr)}\n```\n"
+    if result.error_message:
+        details += f"\nError message: {result.error_message}\n"
+    return details
+
+
 class ReviewerAgent(BaseAgent):
     """Agent specialized in analyzing failures and suggesting improvements"""
 
@@ -72,34 +146,107 @@ class ReviewerAgent(BaseAgent):
         Returns:
             Dict with analysis and suggested fixes
         """
-        prompt = "Analyze this workflow failure:\n\n"
-        prompt += f"Workflow: {result.workflow_name}\n"
-        prompt += f"Duration: {result.duration:.2f}s\n" if result.duration else ""
-        prompt += f"Exit code: {result.exit_code}\n" if result.exit_code else ""
+        prompt = ANALYZE_FAILURE_TEMPLATE.substitute(
+            workflow=result.workflow_name,
+            details=_failure_details(result),
+            language=language,
+            code=code,
+        )
 
-        if result.stdout:
-            prompt += f"\nStdout:\n```\n{result.stdout[:2000]}\n```\n"
+        response = await self.send_message(prompt)
 
-        if result.stderr:
-            prompt += f"\nStderr:\n```\n{result.stderr[:2000]}\n```\n"
+        return {
+            "analysis": response["message"],
+            "usage": response["usage"],
+        }
 
-        if result.error_message:
-            prompt += f"\nError message: {result.error_message}\n"
+    async def analyze_failures(
+        self,
+        results: List[ExecutionResult],
+        code: str,
+        language: str,
+        concurrency: int = 8,
+    ) -> List[dict]:
+        """Analyze many workflow failures concurrently
 
-        prompt += f"\nWorkflow code:\n```{language}\n{code}\n```\n"
+        Args:
+            results: Failed execution results
+            code: Workflow code that failed
+            language: Code language
+            concurrency: Maximum analyses in flight
 
-        prompt += "\nProvide:\n"
-        prompt += "1. Root cause of the failure\n"
-        prompt += "2. Specific code changes to fix it\n"
-        prompt += "3. Additional improvements to prevent similar issues\n"
-        prompt += "4. Confidence level in the fix\n"
+        Returns:
+            analyze_failure's dict per result, in the same order
+        """
+        # Each analysis gets its own conversation so concurrent calls don't interleave
+        return await run_batch(
+            results,
+            lambda result: self.fork().analyze_failure(result, code, language),
+            concurrency,
+        )
+
+    async def analyze_failures_batch(
+        self,
+        results: List[ExecutionResult],
+        code: str,
+        language: str,
+    ) -> List[dict]:
+        """Analyze many workflow failures in a single request
+
+        The model answers with a JSON array. Failures it leaves out, or all of
+        them if the answer can't be parsed, fall back to analyze_failures.
+
+        Args:
+            results: Failed execution results
+            code: Workflow code that failed
+            language: Code language
+
+        Returns:
+            Dict per result, in the same order, with analysis text and (when
+            answered in the batch) root_cause, fix and confidence
+        """
+        if not results:
+            return []
+
+        failures = "".join(
+            f"Failure {i} (started {result.started_at}):\n{_failure_details(result)}\n"
+            for i, result in enumerate(results, 1)
+        )
+        prompt = ANALYZE_FAILURES_BATCH_TEMPLATE.substitute(
+            count=len(results),
+            failures=failures,
+            language=language,
+            code=code,
+        )
 
         response = await self.send_message(prompt)
 
-        return {
-            "analysis": response["message"],
-            "usage": response["usage"],
-        }
+        answered: Dict[int, dict] = {}
+        match = _JSON_ARRAY_RE.search(response["message"])
+        try:
+            items = json.loads(match.group(0)) if match else []
+            for item in items:
+                index = int(item["index"])
+                if 1 <= index <= len(results):
+                    answered[index - 1] = {
+                        "analysis": (
+                            f"Root cause: {item['root_cause']}\n\n"
+                            f"Fix: {item['fix']}\n\n"
+                            f"Confidence: {item['confidence']}"
+                        ),
+                        "root_cause": item["root_cause"],
+                        "fix": item["fix"],
+                        "confidence": item["confidence"],
+                    }
+        except (ValueError, TypeError, KeyError):
+            answered = {}
+
+        missing = [i for i in range(len(results)) if i not in answered]
+        if missing:
+            fallback = await self.analyze_failures([results[i] for i in missing], code, language)
+            answered.update(zip(missing, fallback))
+
+        return [answered[i] for i in range(len(results))]
 
     async def identify_patterns(
         self,
@@ -123,24 +270,24 @@ class ReviewerAgent(BaseAgent):
                 "suggestions": [],
             }
 
-        prompt = "Analyze these recurring failure patterns:\n\n"
+        parts = ["Analyze these recurring failure patterns:\n\n"]
 
         for i, pattern in enumerate(patterns, 1):
-            prompt += f"{i}. {pattern.pattern_type} (occurred {pattern.count} times)\n"
-            prompt += f"   Last seen: {pattern.last_seen}\n"
+            parts.append(f"{i}. {pattern.pattern_type} (occurred {pattern.count} times)\n")
+            parts.append(f"   Last seen: {pattern.last_seen}\n")
             if pattern.error_messages:
-                prompt += f"   Example: {pattern.error_messages[0][:200]}\n"
-            prompt += "\n"
+                parts.append(f"   Example: {pattern.error_messages[0][:200]}\n")
+            parts.append("\n")
 
-        prompt += f"\nCurrent workflow code:\n```{language}\n{code}\n```\n"
+        parts.append(f"\nCurrent workflow code:\n```{language}\n{code}\n```\n")
 
-        prompt += "\nProvide:\n"
-        prompt += "1. Which patterns indicate systemic issues vs. transient problems\n"
-        prompt += "2. Proactive improvements to prevent these failures\n"
-        prompt += "3. Prioritized list of code changes\n"
-        prompt += "4. Risk assessment of each suggested change\n"
+        parts.append("\nProvide:\n")
+        parts.append("1. Which patterns indicate systemic issues vs. transient problems\n")
+        parts.append("2. Proactive improvements to prevent these failures\n")
+        parts.append("3. Prioritized list of code changes\n")
+        parts.append("4. Risk assessment of each suggested change\n")
 
-        response = await self.send_message(prompt)
+        response = await self.send_message("".join(parts))
 
         return {
             "analysis": response["message"],
@@ -163,23 +310,7 @@ class ReviewerAgent(BaseAgent):
         Returns:
             Dict with improvement suggestions
         """
-        prompt = f"Review this {language} workflow and suggest improvements:\n\n"
-        prompt += f"```{language}\n{code}\n```\n"
-
-        if execution_history:
-            prompt += f"\nExecution history:\n{execution_history}\n"
-
-        prompt += "\nSuggest improvements for:\n"
-        prompt += "1. Error handling and resilience\n"
-        prompt += "2. Code clarity and maintainability\n"
-        prompt += "3. Performance optimizations\n"
-        prompt += "4. Security considerations\n"
-        prompt += "5. Logging and observability\n"
-
-        prompt += "\nFor each suggestion, provide:\n"
-        prompt += "- What to change and why\n"
-        prompt += "- Code example\n"
-        prompt += "- Expected impact\n"
+        prompt = self._suggest_improvements_prompt(code, language, execution_history)
 
         response = await self.send_message(prompt)
 
@@ -188,6 +319,40 @@ class ReviewerAgent(BaseAgent):
             "usage": response["usage"],
         }
 
+    async def stream_suggest_improvements(
+        self,
+        code: str,
+        language: str,
+        execution_history: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Suggest general improvements, yielding the response as it arrives
+
+        Args:
+            code: Workflow code
+            language: Code language
+            execution_history: Summary of past executions
+
+        Yields:
+            Chunks of suggestion text
+        """
+        prompt = self._suggest_improvements_prompt(code, language, execution_history)
+
+        async for chunk in self.stream_message(prompt):
+            yield chunk
+
+    def _suggest_improvements_prompt(
+        self,
+        code: str,
+        language: str,
+        execution_history: Optional[str],
+    ) -> str:
+        """Build the improvement suggestion prompt"""
+        return SUGGEST_IMPROVEMENTS_TEMPLATE.substitute(
+            language=language,
+            code=code,
+            history=f"\nExecution history:\n{execution_history}\n" if execution_history else "",
+        )
+
     async def compare_executions(
         self,
         success_result: ExecutionResult,
@@ -204,23 +369,33 @@ class ReviewerAgent(BaseAgent):
         Returns:
             Dict with comparison insights
         """
-        prompt = "Compare these two executions to understand why one failed:\n\n"
+        # Two executions share the prompt, so each gets a smaller log budget
+        def shrink(text: Optional[str]) -> str:
+            return compact_log(text, head=250, tail=750) if text else "N/A"
 
-        prompt += "SUCCESSFUL EXECUTION:\n"
-        prompt += f"Duration: {success_result.duration:.2f}s\n" if success_result.duration else ""
-        prompt += f"Output:\n{success_result.stdout[:1000] if success_result.stdout else 'N/A'}\n\n"
+        success_output = shrink(success_result.stdout)
+        failure_output = shrink(failure_result.stdout)
+        failure_error = shrink(failure_result.stderr)
 
-        prompt += "FAILED EXECUTION:\n"
-        prompt += f"Duration: {failure_result.duration:.2f}s\n" if failure_result.duration else ""
-        prompt += f"Output:\n{failure_result.stdout[:1000] if failure_result.stdout else 'N/A'}\n"
-        prompt += f"Error:\n{failure_result.stderr[:1000] if failure_result.stderr else 'N/A'}\n\n"
+        parts = ["Compare these two executions to understand why one failed:\n\n"]
 
-        prompt += "Identify:\n"
-        prompt += "1. What changed between executions\n"
-        prompt += "2. Possible environmental factors\n"
-        prompt += "3. How to make workflow more resilient\n"
+        parts.append("SUCCESSFUL EXECUTION:\n")
+        if success_result.duration:
+            parts.append(f"Duration: {success_result.duration:.2f}s\n")
+        parts.append(f"Output:\n{success_output}\n\n")
 
-        response = await self.send_message(prompt)
+        parts.append("FAILED EXECUTION:\n")
+        if failure_result.duration:
+            parts.append(f"Duration: {failure_result.duration:.2f}s\n")
+        parts.append(f"Output:\n{failure_output}\n")
+        parts.append(f"Error:\n{failure_error}\n\n")
+
+        parts.append("Identify:\n")
+        parts.append("1. What changed between executions\n")
+        parts.append("2. Possible environmental factors\n")
+        parts.append("3. How to make workflow more resilient\n")
+
+        response = await self.send_message("".join(parts))
 
         return {
             "comparison": response["message"],
@@ -1,19 +1,21 @@
 """CLI interface for workflow automation tool"""
 
 import asyncio
+import itertools
+import os
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Coroutine, Optional, TypeVar
 import typer
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.syntax import Syntax
 
-from .agents.orchestrator import Orchestrator
-from .storage.workflow_store import WorkflowStore
-from .storage.history_store import HistoryStore
-from .storage.models import WorkflowStatus
+from .display import code_syntax, get_console
 
+# Rich, the agents (Anthropic SDK) and storage (pydantic, YAML) are imported
+# inside the commands that use them, so --help and completion start fast
+if TYPE_CHECKING:
+    from .agents.orchestrator import Orchestrator
+
+
+T = TypeVar("T")
 
 app = typer.Typer(
     name="workflow",
@@ -21,11 +23,20 @@ app = typer.Typer(
     add_completion=False,
 )
 
-console = Console()
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """Run a command's coroutine, on uvloop when it is installed"""
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(coro)
+
+    return uvloop.run(coro)
 
 
-def get_orchestrator() -> Orchestrator:
+def get_orchestrator() -> "Orchestrator":
     """Get orchestrator instance"""
+    from .agents.orchestrator import Orchestrator
     return Orchestrator()
 
 
@@ -40,14 +51,17 @@ def teach(
 
     async def _teach():
         orch = get_orchestrator()
-        await orch.teach_workflow(
-            name=name,
-            description=description,
-            language=language,
-            interactive=not non_interactive,
-        )
+        try:
+            await orch.teach_workflow(
+                name=name,
+                description=description,
+                language=language,
+                interactive=not non_interactive,
+            )
+        finally:
+            await orch.aclose()
 
-    asyncio.run(_teach())
+    run_async(_teach())
 
 
 @app.command()
@@ -59,21 +73,30 @@ def run(
 
     async def _run():
         orch = get_orchestrator()
-        await orch.run_workflow(
-            name=name,
-            interactive=not non_interactive,
-        )
+        try:
+            await orch.run_workflow(
+                name=name,
+                interactive=not non_interactive,
+            )
+        finally:
+            await orch.aclose()
 
-    asyncio.run(_run())
+    run_async(_run())
 
 
 @app.command()
 def list():
     """List all workflows"""
+    from rich.live import Live
+    from rich.table import Table
+    from .storage.workflow_store import WorkflowStore
+
+    console = get_console()
     store = WorkflowStore()
-    workflows = store.list_workflows()
+    metadata = store.iter_metadata()
+    first = next(metadata, None)
 
-    if not workflows:
+    if first is None:
         console.print("[yellow]No workflows found.[/]")
         console.print("\nCreate one with: [bold]workflow teach <name> <description>[/]")
         return
@@ -83,23 +106,25 @@ def list():
     table.add_column("Description", style="white")
     table.add_column("Language", style="green")
 
-    for wf_name in workflows:
-        wf = store.load(wf_name)
-        if wf:
+    # Rows appear as they are read
+    with Live(table, console=console, refresh_per_second=10):
+        for wf_name, description, language in itertools.chain([first], metadata):
             table.add_row(
-                wf.name,
-                wf.description[:50] + "..." if len(wf.description) > 50 else wf.description,
-                wf.language.value,
+                wf_name,
+                description[:50] + "..." if len(description) > 50 else description,
+                language,
             )
 
-    console.print(table)
-
 
 @app.command()
 def show(
     name: str = typer.Argument(..., help="Workflow name"),
 ):
     """Show workflow details and code"""
+    from rich.panel import Panel
+    from .storage.workflow_store import WorkflowStore
+
+    console = get_console()
     store = WorkflowStore()
     workflow = store.load(name)
 
@@ -121,7 +146,7 @@ def show(
     # Show code
     console.print(f"\n[bold]Code:[/]")
     console.print(Panel(
-        Syntax(workflow.code, workflow.language.value, theme="monokai", line_numbers=True),
+        code_syntax(workflow.code, workflow.language.value),
         border_style="green",
     ))
 
@@ -133,16 +158,22 @@ def history(
     failed_only: bool = typer.Option(False, "--failed", "-f", help="Show only failed executions"),
 ):
     """Show execution history"""
+    from rich.table import Table
+    from .storage.history_store import HistoryStore
+    from .storage.models import WorkflowStatus
+
+    console = get_console()
     store = HistoryStore()
 
     status_filter = WorkflowStatus.FAILED if failed_only else None
-    executions = store.get_executions(
+    executions = store.iter_executions(
         workflow_name=name,
         status=status_filter,
         limit=limit,
     )
+    first = next(executions, None)
 
-    if not executions:
+    if first is None:
         console.print("[yellow]No execution history found.[/]")
         return
 
@@ -152,7 +183,7 @@ def history(
     table.add_column("Started At", style="white")
     table.add_column("Duration", style="green")
 
-    for exe in executions:
+    for exe in itertools.chain([first], executions):
         status_style = "green" if exe.status == WorkflowStatus.SUCCESS else "red"
         table.add_row(
             exe.workflow_name,
@@ -180,6 +211,9 @@ def delete(
     force: bool = typer.Option(False, "--force", "-f", help="Skip confirmation"),
 ):
     """Delete a workflow"""
+    from .storage.workflow_store import WorkflowStore
+
+    console = get_console()
     store = WorkflowStore()
 
     if not store.exists(name):
@@ -201,9 +235,12 @@ def edit(
     name: str = typer.Argument(..., help="Workflow name"),
 ):
     """Edit workflow code in your default editor"""
-    import os
+    import hashlib
     import subprocess
+    from datetime import datetime
+    from .storage.workflow_store import WorkflowStore
 
+    console = get_console()
     store = WorkflowStore()
     workflow = store.load(name)
 
@@ -212,16 +249,28 @@ def edit(
         raise typer.Exit(1)
 
     # Get code file path
-    ext = "sh" if workflow.language.value == "bash" else "py"
     code_path = store._get_code_path(name, workflow.language)
 
+    def file_state() -> tuple:
+        """Modification time and content digest of the code file"""
+        with open(code_path, 'rb') as f:
+            data = f.read()
+            return os.fstat(f.fileno()).st_mtime_ns, hashlib.blake2b(data).digest(), data
+
+    mtime_before, digest_before, _ = file_state()
+
     # Open in editor
     editor = os.environ.get("EDITOR", "vim")
     subprocess.run([editor, str(code_path)])
 
-    # Reload workflow to show changes
-    updated = store.load(name)
-    if updated and updated.code != workflow.code:
+    # Detect changes from the file itself instead of reloading the workflow;
+    # the digest catches saves that leave the content unchanged
+    mtime_after, digest_after, data = file_state()
+    if mtime_after != mtime_before and digest_after != digest_before:
+        # Hand-edited code no longer matches trusted_sha256, so runs get LLM validation
+        workflow.code = data.decode()
+        workflow.updated_at = datetime.now()
+        store.save(workflow)
         console.print(f"[green]✓[/] Workflow '{name}' updated.")
     else:
         console.print("[dim]No changes made.[/]")
@@ -230,46 +279,91 @@ def edit(
 @app.command()
 def improve(
     name: str = typer.Argument(..., help="Workflow name"),
+    analyze_all: bool = typer.Option(False, "--all", help="Also analyze each recent failure"),
+    limit: int = typer.Option(10, "--limit", "-n", help="Failures to analyze with --all"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Ignore cached reviews"),
 ):
     """Analyze workflow and suggest improvements"""
+    from rich.live import Live
+    from rich.text import Text
+    from .agents.cache import LLMCache
+    from .storage.workflow_store import WorkflowStore
+    from .storage.history_store import HistoryCacheBackend, HistoryStore
+    from .storage.models import WorkflowStatus
+
+    console = get_console()
 
     async def _improve():
         orch = get_orchestrator()
-        store = WorkflowStore()
-        history_store = HistoryStore()
-
-        workflow = store.load(name)
-        if not workflow:
-            console.print(f"[red]Error:[/] Workflow '{name}' not found.")
-            return
-
-        # Get failure patterns
-        patterns = history_store.get_failure_patterns(name)
-
-        if patterns:
-            console.print(f"\n[bold yellow]Found {len(patterns)} failure patterns:[/]")
-            for p in patterns:
-                console.print(f"  • {p.pattern_type}: {p.count} occurrences")
-
-            analysis = await orch.reviewer.identify_patterns(
+        try:
+            store = WorkflowStore()
+            history_store = HistoryStore()
+
+            workflow = store.load(name)
+            if not workflow:
+                console.print(f"[red]Error:[/] Workflow '{name}' not found.")
+                return
+
+            # Reuse reviews of identical requests (same code, patterns and history).
+            # Requests include the workflow code, so edits invalidate them.
+            if not no_cache and orch.reviewer.cache is None:
+                ttl = os.environ.get("WORKFLOW_LLM_CACHE_TTL")
+                orch.reviewer.cache = LLMCache(
+                    HistoryCacheBackend(history_store),
+                    ttl=float(ttl) if ttl else None,
+                )
+
+            # Get failure patterns
+            patterns = history_store.get_failure_patterns(name)
+
+            if patterns:
+                console.print(f"\n[bold yellow]Found {len(patterns)} failure patterns:[/]")
+                for p in patterns:
+                    console.print(f"  • {p.pattern_type}: {p.count} occurrences")
+
+            # Pattern analysis runs in the background while suggestions stream in,
+            # each on its own reviewer conversation
+            pattern_task = asyncio.create_task(orch.reviewer.fork().identify_patterns(
                 patterns=patterns,
                 code=workflow.code,
                 language=workflow.language.value,
-            )
-
-            console.print(f"\n[bold cyan]Analysis:[/]")
-            console.print(analysis["analysis"])
-        else:
-            # General improvement suggestions
-            suggestions = await orch.reviewer.suggest_improvements(
-                code=workflow.code,
-                language=workflow.language.value,
-            )
+            )) if patterns else None
 
             console.print(f"\n[bold cyan]Improvement Suggestions:[/]")
-            console.print(suggestions["suggestions"])
-
-    asyncio.run(_improve())
+            text = Text()
+            with Live(text, console=console, refresh_per_second=20):
+                async for chunk in orch.reviewer.fork().stream_suggest_improvements(
+                    code=workflow.code,
+                    language=workflow.language.value,
+                ):
+                    text.append(chunk)
+
+            if pattern_task:
+                analysis = await pattern_task
+                console.print(f"\n[bold cyan]Analysis:[/]")
+                console.print(analysis["analysis"])
+
+            if analyze_all:
+                failures = history_store.get_executions(
+                    workflow_name=name,
+                    status=WorkflowStatus.FAILED,
+                    limit=limit,
+                )
+
+                analyses = await orch.reviewer.analyze_failures(
+                    results=[failure.to_result() for failure in failures],
+                    code=workflow.code,
+                    language=workflow.language.value,
+                )
+
+                for failure, analysis in zip(failures, analyses):
+                    started = failure.started_at.strftime('%Y-%m-%d %H:%M:%S')
+                    console.print(f"\n[bold cyan]Failure at {started}:[/]")
+                    console.print(analysis["analysis"])
+        finally:
+            await orch.aclose()
+
+    run_async(_improve())
 
 
 @app.command()
@@ -277,6 +371,11 @@ def stats(
     name: str = typer.Argument(..., help="Workflow name"),
 ):
     """Show workflow statistics"""
+    from rich.panel import Panel
+    from .storage.workflow_store import WorkflowStore
+    from .storage.history_store import HistoryStore
+
+    console = get_console()
     store = HistoryStore()
 
     if not WorkflowStore().exists(name):
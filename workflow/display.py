@@ -0,0 +1,29 @@
+"""Shared terminal rendering helpers"""
+
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pygments.lexer import Lexer
+    from rich.console import Console
+    from rich.syntax import Syntax
+
+
+@lru_cache(maxsize=None)
+def get_console() -> "Console":
+    """Get the shared console"""
+    from rich.console import Console
+    return Console()
+
+
+@lru_cache(maxsize=None)
+def get_lexer(language: str) -> "Lexer":
+    """Get the Pygments lexer for a language, resolved once per process"""
+    from pygments.lexers import get_lexer_by_name
+    return get_lexer_by_name(language)
+
+
+def code_syntax(code: str, language: str) -> "Syntax":
+    """Highlighted, line-numbered code for display"""
+    from rich.syntax import Syntax
+    return Syntax(code, get_lexer(language), theme="monokai", line_numbers=True)
@@ -1,12 +1,65 @@
 """Execution history storage using SQLite"""
 
+import asyncio
+import re
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 import json
 
-from .models import ExecutionResult, WorkflowStatus, FailurePattern
+from .models import ExecutionResult, ExecutionRow, WorkflowStatus, FailurePattern
+
+
+# Error message classifiers in priority order. Each alternative is an anchored
+# lookahead, so the first category that occurs anywhere in the message wins
+# (rather than the category that occurs earliest in the message).
+_PATTERN_RE = re.compile(
+    r"^(?:"
+    r"(?=[\s\S]*?(?P<timeout>timeout))"
+    r"|(?=[\s\S]*?(?P<network_error>connection|network))"
+    r"|(?=[\s\S]*?(?P<permission_error>permission|denied))"
+    r"|(?=[\s\S]*?(?P<not_found>not found|404))"
+    r"|(?=[\s\S]*?(?P<rate_limit>rate limit|429))"
+    r"|(?=[\s\S]*?(?P<auth_error>authentication|401))"
+    r"|(?=[\s\S]*?(?P<syntax_error>syntax))"
+    r"|(?=[\s\S]*?(?P<dependency_error>import|module))"
+    r")",
+    re.IGNORECASE,
+)
+
+
+def _truncate_output(text: Optional[str], keep: int = 4096) -> Optional[str]:
+    """Keep the first and last keep characters of long command output"""
+    if text is None or len(text) <= 2 * keep:
+        return text
+
+    omitted = len(text) - 2 * keep
+    return f"{text[:keep]}\n...[truncated {omitted} characters]...\n{text[-keep:]}"
+
+
+# Status lookup by stored value; a plain dict lookup skips EnumMeta.__call__
+_STATUS = WorkflowStatus._value2member_map_
+
+
+def _to_ms(value: datetime) -> int:
+    """Unix time in milliseconds"""
+    return int(value.timestamp() * 1000)
+
+
+def _from_ms(value: int) -> datetime:
+    """Local datetime from unix milliseconds"""
+    return datetime.fromtimestamp(value / 1000)
+
+
+def _started(started_at_ms: Optional[int], started_at: str) -> datetime:
+    """Start time of a row, from the ISO column for rows written by older
+    versions since this database was opened (started_at_ms still NULL)"""
+    if started_at_ms is None:
+        return datetime.fromisoformat(started_at)
+    return _from_ms(started_at_ms)
 
 
 class HistoryStore:
@@ -24,11 +77,47 @@ class HistoryStore:
             db_path = workflows_dir / "history.db"
 
         self.db_path = Path(db_path)
+
+        # One connection for the store's lifetime, shared by worker threads
+        # (history is saved via asyncio.to_thread) and serialized by a lock
+        self._conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        # Background batch writer, started by the first enqueue()
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._write_error: Optional[Exception] = None
+
         self._init_db()
 
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Run statements in a write transaction, rolling back on error"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
     def _init_db(self) -> None:
         """Initialize database schema"""
-        with sqlite3.connect(self.db_path) as conn:
+        # WAL lets readers proceed during writes and, with synchronous=NORMAL,
+        # avoids an fsync on every commit
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA temp_store=MEMORY")
+            self._conn.execute("PRAGMA mmap_size=268435456")
+
+        with self._write() as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS executions (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -44,60 +133,158 @@ class HistoryStore:
                 )
             """)
 
-            # Create index for faster queries
+            # Start time as unix milliseconds for compact integer ordering; the
+            # ISO started_at column is kept for older readers of the database
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(executions)")}
+            if "started_at_ms" not in columns:
+                conn.execute("ALTER TABLE executions ADD COLUMN started_at_ms INTEGER")
+
+            # Backfill on every open: older versions sharing the database keep
+            # inserting rows without it. The partial index holds just those
+            # rows, so the check costs nothing once they are filled in.
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_missing_time_ms
+                ON executions(id) WHERE started_at_ms IS NULL
+            """)
+            conn.executemany(
+                "UPDATE executions SET started_at_ms = ? WHERE id = ?",
+                [
+                    (_to_ms(datetime.fromisoformat(started_at)), row_id)
+                    for row_id, started_at in conn.execute(
+                        "SELECT id, started_at FROM executions WHERE started_at_ms IS NULL"
+                    ).fetchall()
+                ],
+            )
+
+            # Composite index serves name/status filters ordered by time without a
+            # sort step; it supersedes the older indexes
             conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_workflow_name
-                ON executions(workflow_name)
+                CREATE INDEX IF NOT EXISTS idx_wf_status_time_ms
+                ON executions(workflow_name, status, started_at_ms DESC)
             """)
 
+            conn.execute("DROP INDEX IF EXISTS idx_wf_status_time")
+            conn.execute("DROP INDEX IF EXISTS idx_workflow_name")
+            conn.execute("DROP INDEX IF EXISTS idx_status")
+
+            # Cached LLM responses, keyed by a hash of the full request
             conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_status
-                ON executions(status)
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    prompt_hash TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
             """)
 
+    @staticmethod
+    def _row(result: ExecutionResult) -> tuple:
+        """Column values of a result, in INSERT order
+
+        Output is stored as head and tail only, which is what analysis uses.
+        """
+        return (
+            result.workflow_name,
+            result.status.value,
+            result.started_at.isoformat(),
+            _to_ms(result.started_at),
+            result.finished_at.isoformat() if result.finished_at else None,
+            result.duration,
+            result.exit_code,
+            _truncate_output(result.stdout),
+            _truncate_output(result.stderr),
+            result.error_message,
+        )
+
+    _INSERT = """
+        INSERT INTO executions (
+            workflow_name, status, started_at, started_at_ms, finished_at,
+            duration, exit_code, stdout, stderr, error_message
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
     def save_execution(self, result: ExecutionResult) -> int:
         """Save execution result
 
         Returns:
             Execution ID
         """
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute("""
-                INSERT INTO executions (
-                    workflow_name, status, started_at, finished_at,
-                    duration, exit_code, stdout, stderr, error_message
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                result.workflow_name,
-                result.status.value,
-                result.started_at.isoformat(),
-                result.finished_at.isoformat() if result.finished_at else None,
-                result.duration,
-                result.exit_code,
-                result.stdout,
-                result.stderr,
-                result.error_message,
-            ))
+        with self._write() as conn:
+            cursor = conn.execute(self._INSERT, self._row(result))
 
             return cursor.lastrowid
 
-    def get_executions(
+    def save_executions_bulk(self, results: List[ExecutionResult]) -> None:
+        """Save many execution results in a single transaction"""
+        if not results:
+            return
+
+        with self._write() as conn:
+            conn.executemany(self._INSERT, [self._row(result) for result in results])
+
+    async def enqueue(self, result: ExecutionResult) -> None:
+        """Queue a result to be saved by a background writer
+
+        Queued results are written in batches. Call flush() to wait until
+        everything queued so far is on disk.
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._writer = asyncio.create_task(self._write_queued())
+
+        await self._queue.put(result)
+
+    async def flush(self) -> None:
+        """Wait until all queued results are saved"""
+        if self._queue is not None:
+            await self._queue.join()
+
+        if self._write_error is not None:
+            error, self._write_error = self._write_error, None
+            raise error
+
+    async def _write_queued(self, batch_size: int = 64, linger: float = 0.05) -> None:
+        """Background writer: collect up to batch_size results, or whatever
+        arrives within linger seconds of the first, and save them together"""
+        while True:
+            batch = [await self._queue.get()]
+
+            while len(batch) < batch_size:
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=linger))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await asyncio.to_thread(self.save_executions_bulk, batch)
+            except Exception as e:
+                # Keep the writer alive; the error surfaces from flush()
+                self._write_error = e
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def iter_executions(
         self,
         workflow_name: Optional[str] = None,
         status: Optional[WorkflowStatus] = None,
         limit: int = 100,
-    ) -> List[ExecutionResult]:
-        """Get execution history
+        batch_size: int = 64,
+    ) -> Iterator[ExecutionRow]:
+        """Iterate over execution history, fetching rows in batches
 
         Args:
             workflow_name: Filter by workflow name
             status: Filter by status
             limit: Maximum number of results
+            batch_size: Rows fetched from SQLite at a time
 
-        Returns:
-            List of execution results
+        Yields:
+            Execution rows, newest first
         """
-        query = "SELECT * FROM executions WHERE 1=1"
+        query = """
+            SELECT workflow_name, status, started_at_ms, started_at, finished_at,
+                   duration, exit_code, stdout, stderr, error_message
+            FROM executions WHERE 1=1"""
         params = []
 
         if workflow_name:
@@ -108,28 +295,47 @@ class HistoryStore:
             query += " AND status = ?"
             params.append(status.value)
 
-        query += " ORDER BY started_at DESC LIMIT ?"
+        query += " ORDER BY started_at_ms DESC LIMIT ?"
         params.append(limit)
 
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute(query, params)
-
-            results = []
-            for row in cursor.fetchall():
-                results.append(ExecutionResult(
-                    workflow_name=row['workflow_name'],
-                    status=WorkflowStatus(row['status']),
-                    started_at=datetime.fromisoformat(row['started_at']),
-                    finished_at=datetime.fromisoformat(row['finished_at']) if row['finished_at'] else None,
-                    duration=row['duration'],
-                    exit_code=row['exit_code'],
-                    stdout=row['stdout'],
-                    stderr=row['stderr'],
-                    error_message=row['error_message'],
-                ))
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            rows = cursor.fetchmany(batch_size)
+
+        try:
+            while rows:
+                # Rows come from our own inserts, so skip model validation
+                for row in rows:
+                    yield ExecutionRow(
+                        row[0],
+                        _STATUS[row[1]],
+                        _started(row[2], row[3]),
+                        datetime.fromisoformat(row[4]) if row[4] else None,
+                        *row[5:],
+                    )
+
+                with self._lock:
+                    rows = cursor.fetchmany(batch_size)
+        finally:
+            cursor.close()
+
+    def get_executions(
+        self,
+        workflow_name: Optional[str] = None,
+        status: Optional[WorkflowStatus] = None,
+        limit: int = 100,
+    ) -> List[ExecutionRow]:
+        """Get execution history
+
+        Args:
+            workflow_name: Filter by workflow name
+            status: Filter by status
+            limit: Maximum number of results
 
-            return results
+        Returns:
+            List of execution rows, newest first
+        """
+        return list(self.iter_executions(workflow_name, status, limit))
 
     def get_failure_patterns(
         self,
@@ -145,37 +351,37 @@ class HistoryStore:
         Returns:
             List of identified failure patterns
         """
-        # Get failed executions
-        failures = self.get_executions(
-            workflow_name=workflow_name,
-            status=WorkflowStatus.FAILED,
-            limit=50
-        )
-
-        if not failures:
+        # Get error messages of recent failures, without building full results
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT error_message, started_at_ms, started_at FROM executions
+                WHERE workflow_name = ? AND status = ?
+                ORDER BY started_at_ms DESC LIMIT 50
+            """, (workflow_name, WorkflowStatus.FAILED.value)).fetchall()
+
+        if not rows:
             return []
 
-        # Group by error patterns
+        # Group by error patterns. Rows are newest first, so the first row of
+        # each pattern is when it was last seen.
         patterns: dict = {}
 
-        for failure in failures:
-            if not failure.error_message:
+        for error_message, started_at_ms, started_at in rows:
+            if not error_message:
                 continue
 
             # Simple pattern detection (can be improved)
-            pattern_key = self._extract_pattern_key(failure.error_message)
+            pattern_key = self._extract_pattern_key(error_message)
 
             if pattern_key not in patterns:
                 patterns[pattern_key] = {
                     'count': 0,
                     'messages': [],
-                    'last_seen': failure.started_at,
+                    'last_seen': _started(started_at_ms, started_at),
                 }
 
             patterns[pattern_key]['count'] += 1
-            patterns[pattern_key]['messages'].append(failure.error_message)
-            if failure.started_at > patterns[pattern_key]['last_seen']:
-                patterns[pattern_key]['last_seen'] = failure.started_at
+            patterns[pattern_key]['messages'].append(error_message)
 
         # Convert to FailurePattern objects
         result = []
@@ -193,54 +399,70 @@ class HistoryStore:
     def _extract_pattern_key(self, error_message: str) -> str:
         """Extract a pattern key from error message"""
         # Remove specific values to group similar errors
-        error_lower = error_message.lower()
-
-        if 'timeout' in error_lower:
-            return 'timeout'
-        elif 'connection' in error_lower or 'network' in error_lower:
-            return 'network_error'
-        elif 'permission' in error_lower or 'denied' in error_lower:
-            return 'permission_error'
-        elif 'not found' in error_lower or '404' in error_lower:
-            return 'not_found'
-        elif 'rate limit' in error_lower or '429' in error_lower:
-            return 'rate_limit'
-        elif 'authentication' in error_lower or '401' in error_lower:
-            return 'auth_error'
-        elif 'syntax' in error_lower:
-            return 'syntax_error'
-        elif 'import' in error_lower or 'module' in error_lower:
-            return 'dependency_error'
-        else:
-            # Extract first word of error for generic grouping
-            words = error_message.split()
-            return words[0].lower() if words else 'unknown'
+        match = _PATTERN_RE.match(error_message)
+        if match:
+            return match.lastgroup
+
+        # Extract first word of error for generic grouping
+        words = error_message.split(None, 1)
+        return words[0].lower() if words else 'unknown'
 
     def get_stats(self, workflow_name: str) -> dict:
         """Get execution statistics for a workflow"""
-        with sqlite3.connect(self.db_path) as conn:
-            # Total executions
-            total = conn.execute(
-                "SELECT COUNT(*) FROM executions WHERE workflow_name = ?",
-                (workflow_name,)
-            ).fetchone()[0]
-
-            # Success rate
-            successes = conn.execute(
-                "SELECT COUNT(*) FROM executions WHERE workflow_name = ? AND status = ?",
-                (workflow_name, WorkflowStatus.SUCCESS.value)
-            ).fetchone()[0]
-
-            # Average duration
-            avg_duration = conn.execute(
-                "SELECT AVG(duration) FROM executions WHERE workflow_name = ? AND status = ?",
-                (workflow_name, WorkflowStatus.SUCCESS.value)
-            ).fetchone()[0]
-
-            return {
-                'total_executions': total,
-                'successful': successes,
-                'failed': total - successes,
-                'success_rate': (successes / total * 100) if total > 0 else 0,
-                'avg_duration': avg_duration or 0,
-            }
+        with self._lock:
+            # Counts per status and average successful duration in one pass
+            rows = self._conn.execute("""
+                SELECT status, COUNT(*), AVG(duration) FROM executions
+                WHERE workflow_name = ?
+                GROUP BY status
+            """, (workflow_name,)).fetchall()
+
+        counts = {status: count for status, count, _ in rows}
+        total = sum(counts.values())
+        successes = counts.get(WorkflowStatus.SUCCESS.value, 0)
+        avg_duration = next(
+            (avg for status, _, avg in rows if status == WorkflowStatus.SUCCESS.value),
+            None,
+        )
+
+        return {
+            'total_executions': total,
+            'successful': successes,
+            'failed': total - successes,
+            'success_rate': (successes / total * 100) if total > 0 else 0,
+            'avg_duration': avg_duration or 0,
+        }
+
+    def get_cached_response(self, prompt_hash: str) -> Optional[Dict[str, Any]]:
+        """Get a cached response entry ({"created_at", "value"}), or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM response_cache WHERE prompt_hash = ?",
+                (prompt_hash,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {"created_at": row[1], "value": json.loads(row[0])}
+
+    def set_cached_response(self, prompt_hash: str, entry: Dict[str, Any]) -> None:
+        """Store a response entry ({"created_at", "value"})"""
+        with self._write() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO response_cache (prompt_hash, response, created_at)
+                VALUES (?, ?, ?)
+            """, (prompt_hash, json.dumps(entry["value"]), entry["created_at"]))
+
+
+class HistoryCacheBackend:
+    """LLM response cache backend stored in the history database"""
+
+    def __init__(self, store: HistoryStore):
+        self.store = store
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.store.get_cached_response(key)
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        self.store.set_cached_response(key, entry)
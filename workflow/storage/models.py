@@ -1,5 +1,7 @@
 """Data models for workflows and execution history"""
 
+import hashlib
+from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 from typing import Any, Dict, List, Optional
@@ -21,6 +23,11 @@ class WorkflowStatus(str, Enum):
     TIMEOUT = "timeout"
 
 
+def code_digest(code: str) -> str:
+    """SHA-256 hex digest of workflow code, as stored in trusted_sha256"""
+    return hashlib.sha256(code.encode()).hexdigest()
+
+
 class WorkflowConfig(BaseModel):
     """Workflow configuration"""
     name: str
@@ -33,6 +40,16 @@ class WorkflowConfig(BaseModel):
     tags: List[str] = Field(default_factory=list)
     env_vars: Dict[str, str] = Field(default_factory=dict)
     timeout: int = 300  # seconds
+    trusted_sha256: Optional[str] = None  # digest of the code CoderAgent generated
+
+    @property
+    def trusted(self) -> bool:
+        """Whether the code is still exactly what CoderAgent generated
+
+        The code file can be edited outside of workflow edit (editor, git,
+        scripts), so trust follows its content rather than a stored flag.
+        """
+        return self.trusted_sha256 is not None and code_digest(self.code) == self.trusted_sha256
 
     class Config:
         json_encoders = {
@@ -58,6 +75,38 @@ class ExecutionResult(BaseModel):
         }
 
 
+@dataclass(slots=True)
+class ExecutionRow:
+    """Execution history row read back from storage
+
+    Lightweight counterpart of ExecutionResult for data that was already
+    validated when saved; use to_result() where a model is required.
+    """
+    workflow_name: str
+    status: WorkflowStatus
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    duration: Optional[float] = None
+    exit_code: Optional[int] = None
+    stdout: Optional[str] = None
+    stderr: Optional[str] = None
+    error_message: Optional[str] = None
+
+    def to_result(self) -> ExecutionResult:
+        """Convert to a validated ExecutionResult"""
+        return ExecutionResult(
+            workflow_name=self.workflow_name,
+            status=self.status,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            duration=self.duration,
+            exit_code=self.exit_code,
+            stdout=self.stdout,
+            stderr=self.stderr,
+            error_message=self.error_message,
+        )
+
+
 class FailurePattern(BaseModel):
     """Identified failure pattern from history"""
     pattern_type: str  # e.g., "timeout", "api_error", "dependency_missing"
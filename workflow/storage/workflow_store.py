@@ -1,13 +1,91 @@
 """Workflow storage manager"""
 
+import atexit
+import errno
 import json
+import os
+import threading
+import time
+import weakref
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 import yaml
 
+# Prefer the libyaml C bindings; the pure Python parser is many times slower
+try:
+    from yaml import CSafeDumper as _Dumper, CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeDumper as _Dumper, SafeLoader as _Loader
+
 from .models import WorkflowConfig, WorkflowLanguage
 
 
+# Language lookup by stored value; a plain dict lookup skips EnumMeta.__call__
+_LANGUAGE = WorkflowLanguage._value2member_map_
+
+# Serializes read-modify-write of the metadata index within this process
+_index_lock = threading.Lock()
+
+
+def _write_file(path: str, data: str, mode: int = 0o644) -> None:
+    """Write a whole file with one open and as few write calls as possible
+
+    mode (still subject to the umask) applies when the file is created.
+    """
+    buf = memoryview(data.encode())
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    try:
+        while buf:
+            buf = buf[os.write(fd, buf):]
+    finally:
+        os.close(fd)
+
+
+# sendfile errors meaning "not supported for these files" rather than I/O failure
+_NO_SENDFILE = (errno.EINVAL, errno.ENOSYS, errno.ENOTSOCK, errno.EOPNOTSUPP)
+
+
+def _copy_file(path: str, src_fd: int, mode: int = 0o644) -> None:
+    """Copy the whole file behind src_fd to path, in the kernel when possible
+
+    Uses sendfile so the data never passes through Python; platforms where
+    it can't target a regular file fall back to a pread/write loop.
+    """
+    size = os.fstat(src_fd).st_size
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    try:
+        offset = 0
+        try:
+            while offset < size:
+                sent = os.sendfile(fd, src_fd, offset, size - offset)
+                if not sent:
+                    break  # Source shrank while copying
+                offset += sent
+        except (AttributeError, OSError) as e:
+            if isinstance(e, OSError) and e.errno not in _NO_SENDFILE:
+                raise
+            while offset < size:
+                buf = memoryview(os.pread(src_fd, min(size - offset, 1 << 20), offset))
+                if not buf:
+                    break
+                offset += len(buf)
+                while buf:
+                    buf = buf[os.write(fd, buf):]
+    finally:
+        os.close(fd)
+
+
+# Live stores, flushed by one exit handler; weak so finished stores can go
+_stores: "weakref.WeakSet[WorkflowStore]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_stores() -> None:
+    """Write buffered memory appends of all live stores at exit"""
+    for store in list(_stores):
+        store.flush_memory()
+
+
 class WorkflowStore:
     """Manages workflow storage and retrieval"""
 
@@ -23,68 +101,155 @@ class WorkflowStore:
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
 
-    def _get_workflow_dir(self, name: str) -> Path:
+        # Paths below are built as plain strings; pathlib parses every join
+        self._base_str = str(self.base_dir)
+
+        # exists() results by name as (checked_at, exists), trusted for
+        # stat_ttl seconds and dropped whenever this store changes a workflow
+        self.stat_ttl = 1.0
+        self._stat_cache: Dict[str, Tuple[float, bool]] = {}
+
+        # Memory appends waiting to be written, per workflow; flushed in one
+        # write once memory_flush_interval has passed or memory_flush_bytes
+        # are waiting, on read, and at exit
+        self.memory_flush_interval = 0.25
+        self.memory_flush_bytes = 64 * 1024
+        self._pending_memory: Dict[str, List[str]] = {}
+        self._pending_bytes: Dict[str, int] = {}
+        self._last_flush: Dict[str, float] = {}
+        self._memory_lock = threading.Lock()
+        _stores.add(self)
+
+    def __del__(self) -> None:
+        # Stores dropped before exit write their buffered appends here
+        if getattr(self, "_pending_memory", None):
+            self.flush_memory()
+
+    def _get_workflow_dir(self, name: str) -> str:
         """Get directory path for workflow"""
-        return self.base_dir / name
+        return os.path.join(self._base_str, name)
 
-    def _get_config_path(self, name: str) -> Path:
+    def _get_config_path(self, name: str) -> str:
         """Get config file path"""
-        return self._get_workflow_dir(name) / "config.yaml"
+        return os.path.join(self._base_str, name, "config.yaml")
 
-    def _get_code_path(self, name: str, language: WorkflowLanguage) -> Path:
+    def _get_code_path(self, name: str, language: WorkflowLanguage) -> str:
         """Get code file path"""
         ext = "sh" if language == WorkflowLanguage.BASH else "py"
-        return self._get_workflow_dir(name) / f"workflow.{ext}"
+        return os.path.join(self._base_str, name, f"workflow.{ext}")
 
-    def _get_memory_path(self, name: str) -> Path:
+    def _get_memory_path(self, name: str) -> str:
         """Get agent memory file path"""
-        return self._get_workflow_dir(name) / "CLAUDE.md"
+        return os.path.join(self._base_str, name, "CLAUDE.md")
+
+    def _get_index_path(self) -> str:
+        """Get metadata index path (name -> description and language)"""
+        return os.path.join(self._base_str, ".index.json")
+
+    def _read_index(self) -> Dict[str, Dict[str, str]]:
+        """Read the metadata index, or an empty one if missing or corrupt"""
+        try:
+            with open(self._get_index_path(), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _update_index(self, entries: Dict[str, Optional[Dict[str, str]]]) -> None:
+        """Add, replace or (with None) remove index entries"""
+        with _index_lock:
+            index = self._read_index()
+            for name, entry in entries.items():
+                if entry is None:
+                    index.pop(name, None)
+                else:
+                    index[name] = entry
+
+            index_path = self._get_index_path()
+            tmp_path = os.path.join(self._base_str, f".index.{os.getpid()}.tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(index, f)
+            os.replace(tmp_path, index_path)
 
     def exists(self, name: str) -> bool:
         """Check if workflow exists"""
-        return self._get_workflow_dir(name).exists()
+        now = time.monotonic()
+        cached = self._stat_cache.get(name)
+        if cached and now - cached[0] < self.stat_ttl:
+            return cached[1]
+
+        result = os.path.exists(self._get_workflow_dir(name))
+        self._stat_cache[name] = (now, result)
+        return result
 
     def save(self, workflow: WorkflowConfig) -> None:
         """Save workflow to disk"""
-        workflow_dir = self._get_workflow_dir(workflow.name)
-        workflow_dir.mkdir(parents=True, exist_ok=True)
+        self._save(workflow, None)
+
+    def save_from_fd(self, workflow: WorkflowConfig, code_fd: int) -> None:
+        """Save workflow to disk, copying its code from an open file
+
+        For large code that is already in a file (imports, migrations): the
+        code is copied in the kernel instead of through workflow.code, which
+        is ignored. The source is read from its start; its position is left
+        unchanged.
+        """
+        self._save(workflow, code_fd)
+
+    def _save(self, workflow: WorkflowConfig, code_fd: Optional[int]) -> None:
+        """Save workflow config, code (from workflow.code or code_fd) and memory"""
+        os.makedirs(self._get_workflow_dir(workflow.name), exist_ok=True)
+        self._stat_cache.pop(workflow.name, None)
 
         # Save config
-        config_data = workflow.model_dump()
+        config_data = workflow.model_dump(mode="json")
         code = config_data.pop("code")  # Don't store code in config
 
-        with open(self._get_config_path(workflow.name), 'w') as f:
-            yaml.dump(config_data, f, default_flow_style=False)
+        _write_file(
+            self._get_config_path(workflow.name),
+            yaml.dump(config_data, Dumper=_Dumper, default_flow_style=False),
+        )
 
-        # Save code
+        # Save code; bash scripts are created executable
         code_path = self._get_code_path(workflow.name, workflow.language)
-        with open(code_path, 'w') as f:
-            f.write(code)
+        code_mode = 0o755 if workflow.language == WorkflowLanguage.BASH else 0o644
+        if code_fd is None:
+            _write_file(code_path, code, code_mode)
+        else:
+            _copy_file(code_path, code_fd, code_mode)
 
-        # Make bash scripts executable
+        # The mode above only applies to new files; restore a lost exec bit too
         if workflow.language == WorkflowLanguage.BASH:
-            code_path.chmod(0o755)
+            os.chmod(code_path, 0o755)
+
+        self._update_index({workflow.name: {
+            "description": workflow.description,
+            "language": workflow.language.value,
+        }})
 
         # Create memory file if it doesn't exist
         memory_path = self._get_memory_path(workflow.name)
-        if not memory_path.exists():
-            with open(memory_path, 'w') as f:
-                f.write(f"# Workflow: {workflow.name}\n\n")
-                f.write(f"{workflow.description}\n\n")
-                f.write("## Execution History\n\n")
+        try:
+            with open(memory_path, 'x') as f:
+                f.write(
+                    f"# Workflow: {workflow.name}\n\n"
+                    f"{workflow.description}\n\n"
+                    "## Execution History\n\n"
+                )
+        except FileExistsError:
+            pass
 
     def load(self, name: str) -> Optional[WorkflowConfig]:
         """Load workflow from disk"""
-        if not self.exists(name):
-            return None
-
-        # Load config
+        # Load config; a missing workflow fails the open, no separate stat
         config_path = self._get_config_path(name)
-        with open(config_path, 'r') as f:
-            config_data = yaml.safe_load(f)
+        try:
+            with open(config_path, 'r') as f:
+                config_data = yaml.load(f, Loader=_Loader)
+        except FileNotFoundError:
+            return None
 
         # Load code
-        language = WorkflowLanguage(config_data['language'])
+        language = _LANGUAGE[config_data['language']]
         code_path = self._get_code_path(name, language)
         with open(code_path, 'r') as f:
             code = f.read()
@@ -94,16 +259,57 @@ class WorkflowStore:
 
     def list_workflows(self) -> List[str]:
         """List all workflow names"""
-        if not self.base_dir.exists():
-            return []
-
+        # DirEntry.is_dir() comes from the directory listing, so the only
+        # stat left per entry is the config check
         workflows = []
-        for item in self.base_dir.iterdir():
-            if item.is_dir() and self._get_config_path(item.name).exists():
-                workflows.append(item.name)
+        try:
+            with os.scandir(self._base_str) as it:
+                for entry in it:
+                    if entry.is_dir() and os.path.exists(os.path.join(entry.path, "config.yaml")):
+                        workflows.append(entry.name)
+        except FileNotFoundError:
+            return []
 
         return sorted(workflows)
 
+    def iter_metadata(self) -> Iterator[Tuple[str, str, str]]:
+        """Yield (name, description, language) of each workflow, sorted by name
+
+        Reads the metadata index instead of loading every workflow. Workflows
+        missing from the index (e.g. created by an older version) are read from
+        their config and added to it.
+        """
+        index = self._read_index()
+
+        try:
+            with os.scandir(self._base_str) as it:
+                names = sorted(
+                    entry.name for entry in it
+                    if entry.is_dir() and not entry.name.startswith(".")
+                )
+        except FileNotFoundError:
+            return
+
+        missing: Dict[str, Optional[Dict[str, str]]] = {}
+        for name in names:
+            entry = index.get(name)
+            if entry is None:
+                config_path = self._get_config_path(name)
+                if not os.path.exists(config_path):
+                    continue
+                with open(config_path, 'r') as f:
+                    config_data = yaml.load(f, Loader=_Loader)
+                entry = {
+                    "description": config_data["description"],
+                    "language": _LANGUAGE[config_data["language"]].value,
+                }
+                missing[name] = entry
+
+            yield name, entry["description"], entry["language"]
+
+        if missing:
+            self._update_index(missing)
+
     def delete(self, name: str) -> bool:
         """Delete workflow"""
         if not self.exists(name):
@@ -111,25 +317,60 @@ class WorkflowStore:
 
         import shutil
         workflow_dir = self._get_workflow_dir(name)
+        with self._memory_lock:
+            self._pending_memory.pop(name, None)
+            self._pending_bytes.pop(name, None)
         shutil.rmtree(workflow_dir)
+        self._stat_cache.pop(name, None)
+        self._update_index({name: None})
         return True
 
     def update_memory(self, name: str, content: str, append: bool = True) -> None:
         """Update workflow's agent memory"""
-        memory_path = self._get_memory_path(name)
+        self._stat_cache.pop(name, None)
 
-        if append and memory_path.exists():
-            with open(memory_path, 'a') as f:
-                f.write(f"\n{content}\n")
-        else:
-            with open(memory_path, 'w') as f:
-                f.write(content)
+        with self._memory_lock:
+            if not append:
+                self._pending_memory.pop(name, None)
+                self._pending_bytes.pop(name, None)
+                with open(self._get_memory_path(name), 'w') as f:
+                    f.write(content)
+                return
+
+            self._pending_memory.setdefault(name, []).append(content)
+            self._pending_bytes[name] = self._pending_bytes.get(name, 0) + len(content)
+
+            if (
+                self._pending_bytes[name] >= self.memory_flush_bytes
+                or time.monotonic() - self._last_flush.get(name, 0.0) >= self.memory_flush_interval
+            ):
+                self._flush_memory(name)
+
+    def flush_memory(self, name: Optional[str] = None) -> None:
+        """Write buffered memory appends of one workflow, or of all"""
+        with self._memory_lock:
+            for pending in ([name] if name else list(self._pending_memory)):
+                self._flush_memory(pending)
+
+    def _flush_memory(self, name: str) -> None:
+        """Write one workflow's buffered appends; caller holds _memory_lock"""
+        contents = self._pending_memory.pop(name, None)
+        self._pending_bytes.pop(name, None)
+        self._last_flush[name] = time.monotonic()
+        if not contents:
+            return
+
+        with open(self._get_memory_path(name), 'a') as f:
+            # A new file starts with the first entry as is, like a non-append write
+            first = contents[0] if f.tell() == 0 else f"\n{contents[0]}\n"
+            f.write(first + "".join(f"\n{content}\n" for content in contents[1:]))
 
     def get_memory(self, name: str) -> Optional[str]:
         """Get workflow's agent memory"""
+        self.flush_memory(name)
         memory_path = self._get_memory_path(name)
-        if not memory_path.exists():
+        try:
+            with open(memory_path, 'r') as f:
+                return f.read()
+        except FileNotFoundError:
             return None
-
-        with open(memory_path, 'r') as f:
-            return f.read()
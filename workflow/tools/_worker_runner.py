@@ -0,0 +1,179 @@
+"""Long-lived Python worker for PythonExecutor
+
+Reads length-prefixed JSON requests ({"code", "timeout", "cwd"}) on stdin and
+answers each with a length-prefixed JSON response ({"stdout", "stderr",
+"exit_code", "timed_out"}) on stdout. Only uses the standard library so it
+runs under any interpreter PythonExecutor is pointed at.
+"""
+
+import contextlib
+import hashlib
+import importlib
+import io
+import json
+import os
+import signal
+import struct
+import sys
+import tempfile
+import traceback
+from collections import OrderedDict
+from types import CodeType
+from typing import Any, Dict, Optional
+
+_HEADER = struct.Struct(">I")
+
+# Compiled workflows by SHA-256 of their source, least recently used first
+_CODE_CACHE: "OrderedDict[bytes, CodeType]" = OrderedDict()
+_CODE_CACHE_SIZE = 128
+
+
+class _Timeout(BaseException):
+    """Raised by SIGALRM; a BaseException so `except Exception` can't swallow it"""
+
+
+def _on_alarm(signum, frame):
+    raise _Timeout()
+
+
+def compile_cached(code: str) -> CodeType:
+    """Compile workflow source, reusing the code object of an earlier run"""
+    key = hashlib.sha256(code.encode()).digest()
+    compiled = _CODE_CACHE.get(key)
+    if compiled is not None:
+        _CODE_CACHE.move_to_end(key)
+        return compiled
+
+    compiled = compile(code, "<workflow>", "exec")
+    _CODE_CACHE[key] = compiled
+    if len(_CODE_CACHE) > _CODE_CACHE_SIZE:
+        _CODE_CACHE.popitem(last=False)
+    return compiled
+
+
+def run_code(
+    code: str,
+    timeout: Optional[float] = None,
+    cwd: Optional[str] = None,
+    capture: bool = True,
+) -> Dict[str, Any]:
+    """Execute code as __main__, capturing its output
+
+    Must be called from the main thread when timeout is set (SIGALRM).
+
+    Args:
+        code: Python source
+        timeout: Seconds before the run is interrupted
+        cwd: Directory to run in, restored afterwards
+        capture: Collect sys.stdout/sys.stderr writes in the result; when
+            False they go to the process's own streams and the result's
+            stdout and stderr are empty
+
+    Returns:
+        Dict with stdout, stderr, exit_code and timed_out
+    """
+    stdout, stderr = io.StringIO(), io.StringIO()
+    exit_code = 0
+    timed_out = False
+    old_cwd = os.getcwd() if cwd else None
+    old_handler = signal.signal(signal.SIGALRM, _on_alarm) if timeout else None
+
+    try:
+        if cwd:
+            os.chdir(cwd)
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        with contextlib.ExitStack() as redirects:
+            if capture:
+                redirects.enter_context(contextlib.redirect_stdout(stdout))
+                redirects.enter_context(contextlib.redirect_stderr(stderr))
+            try:
+                exec(compile_cached(code), {"__name__": "__main__"})
+            except SystemExit as e:
+                if e.code is None:
+                    exit_code = 0
+                elif isinstance(e.code, int):
+                    exit_code = e.code
+                else:
+                    print(e.code, file=sys.stderr)
+                    exit_code = 1
+            except _Timeout:
+                raise
+            except BaseException as e:
+                # Report from the workflow's frames down, like `python script.py`
+                tb = e.__traceback__
+                while tb is not None and tb.tb_frame.f_code.co_filename == __file__:
+                    tb = tb.tb_next
+                traceback.print_exception(type(e), e, tb)
+                exit_code = 1
+    except _Timeout:
+        timed_out = True
+        exit_code = -signal.SIGALRM
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, old_handler)
+        if old_cwd:
+            os.chdir(old_cwd)
+
+    return {
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "exit_code": exit_code,
+        "timed_out": timed_out,
+    }
+
+
+def _read_frame(stream) -> Optional[bytes]:
+    """Read one length-prefixed frame, or None at EOF"""
+    header = stream.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    return stream.read(_HEADER.unpack(header)[0])
+
+
+def _drain(capture) -> str:
+    """Return and clear the output written to a capture file"""
+    capture.seek(0)
+    data = capture.read()
+    capture.seek(0)
+    capture.truncate()
+    return data.decode(errors="replace")
+
+
+def main() -> None:
+    """Serve requests until stdin closes"""
+    # Keep the protocol on a private fd and point fds 1 and 2 at capture
+    # files. Output from the code and from subprocesses it starts lands
+    # there in order, and can't corrupt the response stream.
+    requests = sys.stdin.buffer
+    responses = os.fdopen(os.dup(1), "wb")
+    out_capture, err_capture = tempfile.TemporaryFile(), tempfile.TemporaryFile()
+    os.dup2(out_capture.fileno(), 1)
+    os.dup2(err_capture.fileno(), 2)
+
+    while True:
+        frame = _read_frame(requests)
+        if frame is None:
+            break
+
+        request = json.loads(frame)
+        # Packages installed since the last run must be importable
+        importlib.invalidate_caches()
+        result = run_code(request["code"], request.get("timeout"), request.get("cwd"), False)
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        result["stdout"] = _drain(out_capture)
+        result["stderr"] = _drain(err_capture)
+        response = json.dumps(result).encode()
+
+        responses.write(_HEADER.pack(len(response)) + response)
+        responses.flush()
+
+
+if __name__ == "__main__":
+    # Don't let sibling modules in this directory shadow user imports
+    if sys.path and os.path.dirname(os.path.abspath(__file__)) == os.path.abspath(sys.path[0]):
+        del sys.path[0]
+    main()
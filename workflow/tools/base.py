@@ -1,18 +1,82 @@
 """Base tool classes and protocols"""
 
+import asyncio
+import codecs
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
-from pydantic import BaseModel
+from dataclasses import asdict, dataclass
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Tuple
 
 
-class ToolResult(BaseModel):
-    """Result from tool execution"""
+# Output kept per stream of a subprocess; the rest is read and dropped
+MAX_OUTPUT_BYTES = 8 * 1024 * 1024
+
+
+@dataclass(slots=True)
+class ToolResult:
+    """Result from tool execution
+
+    A plain dataclass rather than a model: it is built by our own tools on
+    every call, with values that need no validation.
+    """
     success: bool
     output: Optional[str] = None
     error: Optional[str] = None
     data: Optional[Dict[str, Any]] = None
     duration: Optional[float] = None
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Fields that are set, for serializing to the model"""
+        return {key: value for key, value in asdict(self).items() if value is not None}
+
+    def model_dump(self) -> Dict[str, Any]:
+        """All fields, as with the previous pydantic model"""
+        return asdict(self)
+
+
+async def read_stream(
+    stream: asyncio.StreamReader,
+    limit: int = MAX_OUTPUT_BYTES,
+    chunk_size: int = 64 * 1024,
+) -> str:
+    """Read a subprocess pipe to EOF, decoding UTF-8 as it arrives
+
+    Bytes past limit are drained (so the process never blocks on a full
+    pipe) but not kept, and a note with the dropped size is appended.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parts: List[str] = []
+    remaining = limit
+    dropped = 0
+
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            break
+        if remaining >= len(chunk):
+            parts.append(decoder.decode(chunk))
+            remaining -= len(chunk)
+        else:
+            if remaining:
+                parts.append(decoder.decode(memoryview(chunk)[:remaining]))
+            dropped += len(chunk) - remaining
+            remaining = 0
+
+    parts.append(decoder.decode(b"", final=True))
+    if dropped:
+        parts.append(f"\n... [{dropped} bytes of output truncated]\n")
+    return "".join(parts)
+
+
+async def communicate(process: asyncio.subprocess.Process) -> Tuple[str, str]:
+    """Read stdout and stderr of a process concurrently and wait for it to exit"""
+    stdout, stderr = await asyncio.gather(
+        read_stream(process.stdout),
+        read_stream(process.stderr),
+    )
+    await process.wait()
+    return stdout, stderr
+
 
 class Tool(ABC):
     """Base class for all tools"""
@@ -26,14 +90,23 @@ class Tool(ABC):
         """Execute the tool with given parameters"""
         pass
 
-    def to_anthropic_tool(self) -> Dict[str, Any]:
-        """Convert to Anthropic tool format"""
+    @cached_property
+    def anthropic_tool(self) -> Dict[str, Any]:
+        """Tool definition in Anthropic format, built once per tool
+
+        The schema is fixed for the tool's lifetime, so get_input_schema()
+        is only called the first time. Don't mutate the returned dict.
+        """
         return {
             "name": self.name,
             "description": self.description,
             "input_schema": self.get_input_schema()
         }
 
+    def to_anthropic_tool(self) -> Dict[str, Any]:
+        """Convert to Anthropic tool format"""
+        return self.anthropic_tool
+
     @abstractmethod
     def get_input_schema(self) -> Dict[str, Any]:
         """Get JSON schema for tool inputs"""
@@ -1,12 +1,38 @@
 """Bash command execution tool"""
 
 import asyncio
+import os
+import re
+import shlex
 import subprocess
 import time
-from pathlib import Path
 from typing import Any, Dict, Optional
 
-from .base import Tool, ToolResult
+from .base import Tool, ToolResult, communicate
+
+# Aho-Corasick automaton for denied patterns when pyahocorasick is installed
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Anything the shell would expand, redirect, chain or treat specially
+_SHELL_SYNTAX_RE = re.compile(r"[;|&$<>`\n(){}\[\]*?~#\\!]")
+
+# POSIX special and regular builtins, plus utilities sh commonly builds in
+# (echo, printf, test, time). Found on PATH they behave differently (echo -e)
+# or do nothing useful (cd, export), so they always run through sh.
+_SHELL_BUILTINS = frozenset({
+    # Special builtins
+    "break", ":", ".", "continue", "eval", "exec", "exit", "export",
+    "readonly", "return", "set", "shift", "times", "trap", "unset",
+    # Regular builtins
+    "alias", "bg", "cd", "command", "false", "fc", "fg", "getopts", "hash",
+    "jobs", "kill", "newgrp", "pwd", "read", "true", "type", "ulimit",
+    "umask", "unalias", "wait",
+    # Commonly built in
+    "echo", "printf", "test", "time", "local", "source",
+})
 
 
 class BashExecutor(Tool):
@@ -32,12 +58,40 @@ class BashExecutor(Tool):
             ":(){:|:&};:",  # fork bomb
         ])
 
+        # All denied patterns in one matcher, so a check is a single scan: an
+        # Aho-Corasick automaton (linear in the command, whatever the number
+        # of patterns) or else one regex alternation (longest first, so
+        # overlapping patterns report the most specific)
+        self._denied_automaton = None
+        self._denied_re = None
+        if self.denied_commands and ahocorasick is not None:
+            self._denied_automaton = ahocorasick.Automaton()
+            for pattern in self.denied_commands:
+                self._denied_automaton.add_word(pattern, pattern)
+            self._denied_automaton.make_automaton()
+        elif self.denied_commands:
+            self._denied_re = re.compile("|".join(
+                re.escape(pattern)
+                for pattern in sorted(self.denied_commands, key=len, reverse=True)
+            ))
+
+        # os.environ as of first use; env_vars are layered on top per call
+        self._env_snapshot: Optional[Dict[str, str]] = None
+
+    def refresh_env(self) -> None:
+        """Re-read os.environ on the next call, after it was changed"""
+        self._env_snapshot = None
+
     def _is_command_allowed(self, command: str) -> tuple[bool, Optional[str]]:
         """Check if command is allowed to execute"""
         # Check denied commands
-        for denied in self.denied_commands:
-            if denied in command:
+        if self._denied_automaton is not None:
+            for _, denied in self._denied_automaton.iter(command):
                 return False, f"Denied command pattern: {denied}"
+        elif self._denied_re is not None:
+            match = self._denied_re.search(command)
+            if match:
+                return False, f"Denied command pattern: {match.group(0)}"
 
         # If allowed list exists, check it
         if self.allowed_commands:
@@ -47,6 +101,43 @@ class BashExecutor(Tool):
 
         return True, None
 
+    async def _spawn(
+        self,
+        command: str,
+        cwd: Optional[str],
+        env: Optional[Dict[str, str]],
+    ) -> asyncio.subprocess.Process:
+        """Start command directly when it's a plain argv, else through sh -c"""
+        argv = None
+        if not _SHELL_SYNTAX_RE.search(command):
+            try:
+                argv = shlex.split(command)
+            except ValueError:
+                pass  # Unbalanced quotes; sh reports the error
+
+        # Leading VAR=value assignments and builtins need the shell
+        if argv and "=" not in argv[0] and argv[0] not in _SHELL_BUILTINS:
+            try:
+                return await asyncio.create_subprocess_exec(
+                    *argv,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    cwd=cwd,
+                    env=env,
+                )
+            except OSError:
+                # Missing commands and scripts without a shebang (ENOEXEC):
+                # let sh run or report them as before
+                pass
+
+        return await asyncio.create_subprocess_shell(
+            command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd,
+            env=env,
+        )
+
     async def execute(
         self,
         command: str,
@@ -69,13 +160,13 @@ class BashExecutor(Tool):
         # Prepare environment
         env = None
         if env_vars:
-            import os
-            env = os.environ.copy()
-            env.update(env_vars)
+            if self._env_snapshot is None:
+                self._env_snapshot = dict(os.environ)
+            env = {**self._env_snapshot, **env_vars}
 
         # Prepare working directory
-        cwd = Path(working_dir) if working_dir else None
-        if cwd and not cwd.exists():
+        cwd = working_dir or None
+        if cwd and not os.path.exists(cwd):
             return ToolResult(
                 success=False,
                 error=f"Working directory does not exist: {working_dir}",
@@ -84,18 +175,12 @@ class BashExecutor(Tool):
 
         # Execute command
         try:
-            process = await asyncio.create_subprocess_shell(
-                command,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=cwd,
-                env=env,
-            )
+            process = await self._spawn(command, cwd, env)
 
             # Wait with timeout
             timeout_val = timeout or self.default_timeout
             stdout, stderr = await asyncio.wait_for(
-                process.communicate(),
+                communicate(process),
                 timeout=timeout_val
             )
 
@@ -103,8 +188,8 @@ class BashExecutor(Tool):
 
             return ToolResult(
                 success=process.returncode == 0,
-                output=stdout.decode('utf-8', errors='replace'),
-                error=stderr.decode('utf-8', errors='replace') if process.returncode != 0 else None,
+                output=stdout,
+                error=stderr if process.returncode != 0 else None,
                 data={
                     "exit_code": process.returncode,
                     "command": command,
@@ -1,13 +1,30 @@
 """Python code execution tool"""
 
 import asyncio
+import atexit
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import struct
 import sys
 import tempfile
+import threading
 import time
+from collections import deque
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Deque, Dict, List, Optional, Set
 
-from .base import Tool, ToolResult
+from ._worker_runner import run_code
+from .base import Tool, ToolResult, communicate
+
+# Persistent worker script and its length-prefixed JSON framing
+_WORKER_SCRIPT = Path(__file__).with_name("_worker_runner.py")
+_HEADER = struct.Struct(">I")
+
+# Extra seconds the worker gets to report its own timeout before it is killed
+_WORKER_GRACE = 2.0
 
 
 class PythonExecutor(Tool):
@@ -18,7 +35,29 @@ class PythonExecutor(Tool):
         default_timeout: int = 300,
         use_virtualenv: bool = False,
         python_path: Optional[str] = None,
+        persistent: bool = False,
+        inprocess: bool = False,
     ):
+        """Initialize Python executor
+
+        Args:
+            default_timeout: Timeout in seconds when execute() gets none
+            use_virtualenv: Run in a virtualenv
+            python_path: Interpreter to run code with (defaults to this one)
+            persistent: Run code in one long-lived interpreter instead of a
+                new process per call. Skips interpreter startup, but runs
+                share imported modules and other process state.
+            inprocess: Run code without requirements or working_dir
+                directly in this process. Fastest, but blocks the event
+                loop while it runs and gives the code full access to this
+                process; only for trusted workflows. Output is captured by
+                swapping the process-wide sys.stdout and sys.stderr, so
+                writes from other threads (asyncio.to_thread work, console
+                output) during a run end up in its output. Calls with a
+                working_dir use the worker or a subprocess instead, since
+                changing the process cwd would also move relative paths
+                used by other threads.
+        """
         super().__init__(
             name="python_executor",
             description="Execute Python code safely with timeout and monitoring"
@@ -26,6 +65,33 @@ class PythonExecutor(Tool):
         self.default_timeout = default_timeout
         self.use_virtualenv = use_virtualenv
         self.python_path = python_path or sys.executable
+        self.persistent = persistent
+        self.inprocess = inprocess
+
+        self._worker: Optional[asyncio.subprocess.Process] = None
+        self._worker_lock = asyncio.Lock()
+
+        # Reusable script files, created on first use and removed at exit
+        self._slot_dir: Optional[str] = None
+        self._slot_ids = itertools.count()
+        self._free_slots: Deque[str] = deque()
+
+        # Hashes of requirement sets this executor already installed
+        self._installed: Set[str] = set()
+
+    def _acquire_slot(self) -> str:
+        """Take a free script file path, adding one if all are in use"""
+        if self._free_slots:
+            return self._free_slots.pop()
+
+        if self._slot_dir is None:
+            self._slot_dir = tempfile.mkdtemp(prefix="pyexec-")
+            atexit.register(shutil.rmtree, self._slot_dir, True)
+        return os.path.join(self._slot_dir, f"slot_{next(self._slot_ids)}.py")
+
+    def _release_slot(self, path: str) -> None:
+        """Return a script file path to the pool"""
+        self._free_slots.append(path)
 
     async def execute(
         self,
@@ -37,14 +103,24 @@ class PythonExecutor(Tool):
         """Execute Python code"""
         start_time = time.time()
 
-        # Create temporary file for code
-        with tempfile.NamedTemporaryFile(
-            mode='w',
-            suffix='.py',
-            delete=False
-        ) as f:
-            f.write(code)
-            script_path = f.name
+        # The timeout relies on SIGALRM, which only the main thread receives
+        in_main_thread = threading.current_thread() is threading.main_thread()
+        if self.inprocess and not requirements and not working_dir and in_main_thread:
+            return self._execute_inprocess(code, timeout, start_time)
+
+        if self.persistent:
+            return await self._execute_in_worker(
+                code, timeout, requirements, working_dir, start_time
+            )
+
+        # Write code to a pooled script file (truncated, not recreated)
+        script_path = self._acquire_slot()
+        try:
+            with open(script_path, 'w') as f:
+                f.write(code)
+        except Exception:
+            self._release_slot(script_path)
+            raise
 
         try:
             # Install requirements if provided
@@ -68,7 +144,7 @@ class PythonExecutor(Tool):
             # Wait with timeout
             timeout_val = timeout or self.default_timeout
             stdout, stderr = await asyncio.wait_for(
-                process.communicate(),
+                communicate(process),
                 timeout=timeout_val
             )
 
@@ -76,8 +152,8 @@ class PythonExecutor(Tool):
 
             return ToolResult(
                 success=process.returncode == 0,
-                output=stdout.decode('utf-8', errors='replace'),
-                error=stderr.decode('utf-8', errors='replace') if process.returncode != 0 else None,
+                output=stdout,
+                error=stderr if process.returncode != 0 else None,
                 data={
                     "exit_code": process.returncode,
                 },
@@ -106,34 +182,173 @@ class PythonExecutor(Tool):
             )
 
         finally:
-            # Clean up temp file
+            # The process has exited (or been killed), so the file is free
+            self._release_slot(script_path)
+
+    async def _ensure_worker(self) -> asyncio.subprocess.Process:
+        """Return the running worker, starting a new one if needed"""
+        if self._worker is None or self._worker.returncode is not None:
+            self._worker = await asyncio.create_subprocess_exec(
+                self.python_path,
+                "-u",
+                str(_WORKER_SCRIPT),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+        return self._worker
+
+    async def _kill_worker(self) -> None:
+        """Kill the worker; the next run starts a fresh one"""
+        worker, self._worker = self._worker, None
+        if worker is not None and worker.returncode is None:
             try:
-                Path(script_path).unlink()
-            except:
+                worker.kill()
+                await worker.wait()
+            except ProcessLookupError:
                 pass
 
+    async def close(self) -> None:
+        """Stop the persistent worker, if any"""
+        async with self._worker_lock:
+            await self._kill_worker()
+
+    def _run_result(
+        self,
+        response: Dict[str, Any],
+        timeout_val: int,
+        start_time: float,
+    ) -> ToolResult:
+        """Convert a run_code response into a ToolResult"""
+        if response["timed_out"]:
+            return ToolResult(
+                success=False,
+                error=f"Code execution timed out after {timeout_val} seconds",
+                duration=time.time() - start_time
+            )
+
+        exit_code = response["exit_code"]
+        return ToolResult(
+            success=exit_code == 0,
+            output=response["stdout"],
+            error=response["stderr"] if exit_code != 0 else None,
+            data={
+                "exit_code": exit_code,
+            },
+            duration=time.time() - start_time
+        )
+
+    def _execute_inprocess(
+        self,
+        code: str,
+        timeout: Optional[int],
+        start_time: float,
+    ) -> ToolResult:
+        """Execute Python code in this process, in its current directory"""
+        timeout_val = timeout or self.default_timeout
+
+        try:
+            response = run_code(code, timeout_val)
+        except Exception as e:
+            return ToolResult(
+                success=False,
+                error=f"Execution error: {str(e)}",
+                duration=time.time() - start_time
+            )
+
+        return self._run_result(response, timeout_val, start_time)
+
+    async def _execute_in_worker(
+        self,
+        code: str,
+        timeout: Optional[int],
+        requirements: Optional[list[str]],
+        working_dir: Optional[str],
+        start_time: float,
+    ) -> ToolResult:
+        """Execute Python code in the persistent worker"""
+        if requirements:
+            pip_result = await self._install_requirements(requirements)
+            if not pip_result.success:
+                return pip_result
+
+        cwd = Path(working_dir) if working_dir else Path.cwd()
+        timeout_val = timeout or self.default_timeout
+        request = json.dumps({"code": code, "timeout": timeout_val, "cwd": str(cwd)}).encode()
+
+        # The worker runs one request at a time
+        async with self._worker_lock:
+            try:
+                worker = await self._ensure_worker()
+                worker.stdin.write(_HEADER.pack(len(request)) + request)
+                await worker.stdin.drain()
+
+                header = await asyncio.wait_for(
+                    worker.stdout.readexactly(_HEADER.size),
+                    timeout=timeout_val + _WORKER_GRACE
+                )
+                response = json.loads(await worker.stdout.readexactly(_HEADER.unpack(header)[0]))
+
+            except asyncio.TimeoutError:
+                # Stuck where SIGALRM can't reach (e.g. inside C code)
+                await self._kill_worker()
+                response = {"timed_out": True}
+
+            except Exception as e:
+                # Crashed or broken pipe; don't reuse it
+                await self._kill_worker()
+                return ToolResult(
+                    success=False,
+                    error=f"Execution error: {str(e)}",
+                    duration=time.time() - start_time
+                )
+
+        return self._run_result(response, timeout_val, start_time)
+
     async def _install_requirements(self, requirements: list[str]) -> ToolResult:
-        """Install Python packages"""
+        """Install Python packages
+
+        Uses uv when it is on PATH (falling back to pip if uv fails), and
+        skips sets of requirements this executor already installed.
+        """
+        req_hash = hashlib.sha256("\n".join(sorted(requirements)).encode()).hexdigest()
+        if req_hash in self._installed:
+            return ToolResult(success=True, output="Requirements already installed", duration=0.0)
+
+        result = None
+        if shutil.which("uv"):
+            result = await self._run_installer([
+                "uv", "pip", "install", "--python", self.python_path, *requirements,
+            ])
+        if result is None or not result.success:
+            result = await self._run_installer([
+                self.python_path, "-m", "pip", "install", *requirements,
+            ])
+
+        if result.success:
+            self._installed.add(req_hash)
+        return result
+
+    async def _run_installer(self, argv: List[str]) -> ToolResult:
+        """Run a package install command"""
         start_time = time.time()
 
         try:
             process = await asyncio.create_subprocess_exec(
-                self.python_path,
-                "-m", "pip", "install",
-                *requirements,
+                *argv,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
             )
 
             stdout, stderr = await asyncio.wait_for(
-                process.communicate(),
+                communicate(process),
                 timeout=120  # 2 minutes for pip install
             )
 
             return ToolResult(
                 success=process.returncode == 0,
-                output=stdout.decode('utf-8', errors='replace'),
-                error=stderr.decode('utf-8', errors='replace') if process.returncode != 0 else None,
+                output=stdout,
+                error=stderr if process.returncode != 0 else None,
                 duration=time.time() - start_time
             )
 